@@ -0,0 +1,155 @@
+# Balances waves by simulating lots of games at once
+# Every wave config (a json file laid out like data/WaveData.json) is played
+# by the headless bot with a range of seeds, spread over all the CPU cores,
+# and the results are summed up per config: how long the bot survived, how
+# far it got, kills and time per wave, and the most enemies and bullets at once.
+# e.g. compare two versions of the waves over 50 seeds each:
+#   python balance.py data/WaveData.json harder.json --seeds 50
+#   python balance.py configs/*.json --seconds 600 --output report.json
+
+import argparse
+import json
+import multiprocessing
+import os
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# wave tables loaded in this worker process - config file -> WaveTable
+_waveTables = {}
+
+
+# play one game - run in a worker process
+# job - (config file, seed, seconds)
+def simulate(job):
+    configFile, seed, seconds = job
+    # the game is only started in the workers, not in the main process
+    try:
+        import headless
+    except SystemExit:
+        # bootstrap() has already printed why - report it rather than breaking the pool
+        return {'config': configFile, 'seed': seed, 'error': 'unable to start the game'}
+    from data import waves as wv
+
+    if configFile not in _waveTables:
+        try:
+            _waveTables[configFile] = wv.WaveTable(configFile, headless.game.enemyRegistry)
+        except SystemExit:
+            # the wave table has already printed why
+            _waveTables[configFile] = None
+    table = _waveTables[configFile]
+    if table is None:
+        return {'config': configFile, 'seed': seed, 'error': 'unable to load wave data'}
+    headless.game.waveTable = table
+
+    try:
+        stats = headless.run(seconds, seed)
+    except Exception as e:
+        # a config that breaks the game mid run (e.g. weights of 0) - report it
+        # rather than losing every other result in the sweep
+        return {'config': configFile, 'seed': seed,
+                'error': 'game crashed: %s: %s' % (type(e).__name__, e)}
+    stats['config'] = configFile
+    return stats
+
+
+# sum up the runs of one config
+def summarise(results):
+    survival = [result['simulatedSeconds'] for result in results]
+    waves = [result['wave'] for result in results]
+
+    # per wave - how many runs got to it, and the average kills and time spent on it
+    perWave = {}
+    for result in results:
+        for waveNumber, kills in result['killsPerWave'].items():
+            wave = perWave.setdefault(int(waveNumber), {'reached': 0, 'kills': [], 'seconds': []})
+            wave['reached'] += 1
+            wave['kills'].append(kills)
+            wave['seconds'].append(result['secondsPerWave'][waveNumber])
+
+    return {
+        'runs': len(results),
+        'deaths': sum(1 for result in results if result['died']),
+        'survivalMean': statistics.mean(survival),
+        'survivalMedian': statistics.median(survival),
+        'survivalMin': min(survival),
+        'survivalMax': max(survival),
+        'waveMean': statistics.mean(waves),
+        'waveMax': max(waves),
+        'scoreMean': statistics.mean(result['score'] for result in results),
+        'peakEnemiesMean': statistics.mean(result['peakEnemies'] for result in results),
+        'peakEnemiesMax': max(result['peakEnemies'] for result in results),
+        'peakBulletsMax': max(result['peakBullets'] for result in results),
+        'waves': {waveNumber: {'reached': wave['reached'],
+                               'killsMean': statistics.mean(wave['kills']),
+                               'secondsMean': statistics.mean(wave['seconds'])}
+                  for waveNumber, wave in sorted(perWave.items())},
+    }
+
+
+def printSummary(config, summary):
+    print('%s - %d runs, %d died' % (config, summary['runs'], summary['deaths']))
+    print('  survived  mean %.1f s, median %.1f s, min %.1f s, max %.1f s' %
+          (summary['survivalMean'], summary['survivalMedian'],
+           summary['survivalMin'], summary['survivalMax']))
+    print('  wave      mean %.2f, best %d    score mean %.1f' %
+          (summary['waveMean'], summary['waveMax'], summary['scoreMean']))
+    print('  peak      enemies mean %.1f, max %d    bullets max %d' %
+          (summary['peakEnemiesMean'], summary['peakEnemiesMax'], summary['peakBulletsMax']))
+    print('  wave  reached  kills  seconds')
+    for waveNumber, wave in summary['waves'].items():
+        print('  %4d  %7d  %5.1f  %7.1f' %
+              (waveNumber, wave['reached'], wave['killsMean'], wave['secondsMean']))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Simulate many games per wave config to help balance the waves.')
+    parser.add_argument('configs', nargs='*', default=['data/WaveData.json'],
+                        help='wave data json files to test (default data/WaveData.json)')
+    parser.add_argument('--seeds', type=int, default=20,
+                        help='games per config, each with a different seed (default 20)')
+    parser.add_argument('--first-seed', type=int, default=0,
+                        help='seed of the first game (default 0)')
+    parser.add_argument('--seconds', type=float, default=300,
+                        help='most simulated seconds per game (default 300)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='processes to use (default one per CPU core)')
+    parser.add_argument('--output', help='JSON file to write the report to')
+    args = parser.parse_args()
+
+    # the workers run from the game's folder, so give them full paths
+    configs = [os.path.abspath(config) for config in args.configs]
+    jobs = [(config, seed, args.seconds) for config in configs
+            for seed in range(args.first_seed, args.first_seed + args.seeds)]
+    workers = args.workers or os.cpu_count() or 1
+
+    startTime = time.perf_counter()
+    # spawn rather than fork, so every worker starts pygame cleanly (and it works the same on windows)
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        results = list(executor.map(simulate, jobs,
+                                    chunksize=max(1, len(jobs) // (workers * 4))))
+    realSeconds = time.perf_counter() - startTime
+
+    report = {'seconds': args.seconds, 'seeds': args.seeds, 'configs': {}}
+    for config, original in zip(configs, args.configs):
+        configResults = [result for result in results if result['config'] == config]
+        errors = [result for result in configResults if 'error' in result]
+        if errors:
+            print('%s - %s' % (original, errors[0]['error']))
+            report['configs'][original] = {'error': errors[0]['error']}
+            continue
+        summary = summarise(configResults)
+        printSummary(original, summary)
+        summary['results'] = configResults
+        report['configs'][original] = summary
+    print('Simulated %d games on %d processes in %.1f seconds' % (len(jobs), workers, realSeconds))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
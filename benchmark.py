@@ -0,0 +1,225 @@
+# Frame benchmarks for the game's hot paths
+# Each scenario starts a new game with a fixed random seed and plays it with a
+# scripted input (walking in a square and holding shoot) on SDL's dummy video
+# driver, so every run does exactly the same work.
+# Every frame is one simulation tick plus one drawn frame, and each phase
+# (events, the simulation phases, drawing and the display update) is timed
+# separately. The results are written to a JSON file so runs can be compared:
+#   python benchmark.py --output before.json
+#   python benchmark.py --output after.json --compare before.json
+
+import argparse
+import json
+import os
+import platform
+import random
+import time
+
+# use SDL's dummy video driver so no window is opened
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+# the game loads everything relative to its own folder
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import pygame  # noqa: E402
+import game  # noqa: E402
+
+# open the (dummy) window and load the game
+game.bootstrap()
+
+
+# the scripted input - (tick in the loop, event type, key), repeated every 240 ticks
+inputScript = (
+    (0, pygame.KEYDOWN, pygame.K_RIGHT),
+    (60, pygame.KEYUP, pygame.K_RIGHT),
+    (60, pygame.KEYDOWN, pygame.K_UP),
+    (120, pygame.KEYUP, pygame.K_UP),
+    (120, pygame.KEYDOWN, pygame.K_LEFT),
+    (180, pygame.KEYUP, pygame.K_LEFT),
+    (180, pygame.KEYDOWN, pygame.K_DOWN),
+    (239, pygame.KEYUP, pygame.K_DOWN),
+)
+inputScriptLength = 240
+
+
+# set up a new game for a scenario
+def startScenario(name, seed, enemyCount):
+    random.seed(seed)
+    game.saveHighscores = False
+    game.resetGame()
+    game.playGame()
+    # the player can't be hit, so every run lasts the whole benchmark
+    game.player.hitCooldown = float('inf')
+    game.player.hitTimer = game.timers.cooldown(game.player.hitCooldown)
+
+    if name == 'wave1':
+        pass
+    elif name == 'lastLimitedWave':
+        # the last wave with limited spawns - the final wave in the table is
+        # endless mode, which is the endless scenario
+        game.player.waveNumber = len(game.waveTable) - 1
+        game.player.getWave()
+    elif name == 'endless':
+        game.player.waveNumber = len(game.waveTable)
+        game.player.getWave()
+        for i in range(enemyCount):
+            game.spawnEnemyAtRanPos(game.player.enemyTypesForWave,
+                                    game.player.enemyCumWeightsForWave)
+    else:
+        raise ValueError('Unknown scenario: ' + repr(name))
+
+
+# post this tick's scripted events, then handle the event queue like gameLoop does
+def pumpEvents(tick):
+    loopTick = tick % inputScriptLength
+    for scriptTick, eventType, key in inputScript:
+        if scriptTick == loopTick:
+            pygame.event.post(pygame.event.Event(eventType, key=key))
+    for event in pygame.event.get():
+        game.handleEvent(event)
+    game.player.shootPressed = True
+
+
+# run a scenario and time every phase of every frame
+# returns a dictionary of phase name -> list of times in seconds, and some stats
+def runScenario(name, frames, warmup, seed, enemyCount):
+    startScenario(name, seed, enemyCount)
+
+    phaseNames = (['events'] + [phaseName for phaseName, phase in game.simulationPhases] +
+                  ['draw', 'display'])
+    times = {phaseName: [] for phaseName in phaseNames}
+    times['frame'] = []
+    peakEnemies = 0
+    peakBullets = 0
+    clock = time.perf_counter
+
+    for tick in range(warmup + frames):
+        frameTimes = []
+        frameStart = clock()
+
+        start = clock()
+        pumpEvents(tick)
+        frameTimes.append(clock() - start)
+        for phaseName, phase in game.simulationPhases:
+            start = clock()
+            phase()
+            frameTimes.append(clock() - start)
+        start = clock()
+        game.drawFrame()
+        frameTimes.append(clock() - start)
+        start = clock()
+        game.renderer.update()
+        frameTimes.append(clock() - start)
+
+        frameTime = clock() - frameStart
+        if tick < warmup:
+            continue
+        for phaseName, phaseTime in zip(phaseNames, frameTimes):
+            times[phaseName].append(phaseTime)
+        times['frame'].append(frameTime)
+        peakEnemies = max(peakEnemies, len(game.enemies))
+        peakBullets = max(peakBullets, len(game.bullets) + len(game.enemyBullets))
+
+    return {
+        'frames': frames,
+        'seed': seed,
+        'peakEnemies': peakEnemies,
+        'peakBullets': peakBullets,
+        'phases': {phaseName: summarise(phaseTimes) for phaseName, phaseTimes in times.items()},
+    }
+
+
+# percentile of a sorted list (nearest rank)
+def percentile(sortedTimes, percent):
+    index = max(0, min(len(sortedTimes) - 1,
+                       int(round(percent / 100 * len(sortedTimes))) - 1))
+    return sortedTimes[index]
+
+
+# mean, percentiles and max of a list of times, in milliseconds
+def summarise(times):
+    if not times:
+        return {}
+    sortedTimes = sorted(times)
+    return {
+        'meanMs': sum(times) / len(times) * 1000,
+        'p50Ms': percentile(sortedTimes, 50) * 1000,
+        'p95Ms': percentile(sortedTimes, 95) * 1000,
+        'p99Ms': percentile(sortedTimes, 99) * 1000,
+        'maxMs': sortedTimes[-1] * 1000,
+    }
+
+
+# the settings and versions a run was made with
+def runInfo():
+    return {
+        'python': platform.python_version(),
+        'pygame': pygame.version.ver,
+        'platform': platform.platform(),
+        'collisionMode': game.collisionMode,
+        'vectorMovement': game.useVectorMovement and game.movement.available,
+        'dirtyRects': game.renderer.dirtyRects,
+    }
+
+
+# print the results, with the change from an older run if there is one
+def printResults(results, old=None):
+    print('startup - ' + ', '.join('%s %.1f ms' % (name, ms)
+                                   for name, ms in results['startupMs'].items()))
+    for name, scenario in results['scenarios'].items():
+        print('%s - %d frames, peak %d enemies, %d bullets' %
+              (name, scenario['frames'], scenario['peakEnemies'], scenario['peakBullets']))
+        oldPhases = {}
+        if old is not None and name in old.get('scenarios', {}):
+            oldPhases = old['scenarios'][name]['phases']
+        for phaseName, stats in scenario['phases'].items():
+            line = '  %-10s mean %7.3f ms  p95 %7.3f ms  p99 %7.3f ms' % (
+                phaseName, stats['meanMs'], stats['p95Ms'], stats['p99Ms'])
+            oldStats = oldPhases.get(phaseName)
+            if oldStats and oldStats['meanMs'] > 0:
+                change = (stats['meanMs'] / oldStats['meanMs'] - 1) * 100
+                line += '  (%+.1f%% mean)' % change
+            print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark the game loop with scripted input.')
+    parser.add_argument('--scenario', action='append',
+                        choices=['wave1', 'lastLimitedWave', 'endless'],
+                        help='scenario to run, can be given more than once (default all)')
+    parser.add_argument('--frames', type=int, default=1200,
+                        help='frames to time per scenario (default 1200)')
+    parser.add_argument('--warmup', type=int, default=60,
+                        help='frames to run before timing (default 60)')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='random seed (default 1)')
+    parser.add_argument('--enemies', type=int, default=500,
+                        help='enemies spawned at the start of endless (default 500)')
+    parser.add_argument('--vector-movement', action='store_true',
+                        help='move everything with NumPy (useVectorMovement)')
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help='JSON file to write results to')
+    parser.add_argument('--compare', help='JSON file from an earlier run to compare with')
+    args = parser.parse_args()
+    # picked up by resetGame() at the start of each scenario
+    game.useVectorMovement = args.vector_movement
+
+    results = {'info': runInfo(),
+               'startupMs': {name: seconds * 1000 for name, seconds in game.startupTimes.items()},
+               'scenarios': {}}
+    for name in args.scenario or ['wave1', 'lastLimitedWave', 'endless']:
+        results['scenarios'][name] = runScenario(name, args.frames, args.warmup,
+                                                 args.seed, args.enemies)
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+    old = None
+    if args.compare:
+        with open(args.compare) as f:
+            old = json.load(f)
+    printResults(results, old)
+
+
+if __name__ == '__main__':
+    main()
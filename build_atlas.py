@@ -0,0 +1,121 @@
+# Builds the sprite atlas - every sprite packed into one image
+# Run this whenever a sprite is added or changed:
+#   python build_atlas.py
+# It packs every png in data/Sprites and data/MenuImages into data/atlas.png
+# and writes data/atlas.json, an index of where each image went.
+# The game then decodes the one atlas image and hands out subsurfaces of it
+# (which share the atlas's pixels) instead of loading and slicing each sheet.
+#
+# Sprite sheets (files ending in SS.png) are always sliced with black as the
+# colour key, so in the atlas their black pixels are already made transparent.
+# Images bigger than maxSpriteSize (the menu background) are left out - they
+# aren't sprites and would just make the atlas huge.
+# If a sprite is changed after the atlas is built, the game notices from its
+# modified time and loads that file on its own until the atlas is rebuilt.
+
+import argparse
+import glob
+import json
+import os
+
+# no window is needed to build the atlas
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+# the paths are relative to the game's folder
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import pygame  # noqa: E402
+
+# folders to pack (windows style paths, like the game uses)
+sourceDirs = ['data\\Sprites', 'data\\MenuImages']
+# colour key that sprite sheets are sliced with
+sheetColorkey = (0, 0, 0)
+# images wider or taller than this aren't packed
+maxSpriteSize = 1024
+# gap between images
+padding = 1
+
+
+# load an image, with its black pixels made transparent if it is a sprite sheet
+# this gives the same pixels as assets.sliceImage does with a colour key:
+# the image drawn onto black, then everything that is black made transparent
+def loadSprite(path, colorkey):
+    image = pygame.image.load(path)
+    if colorkey is None:
+        return image
+    keyed = pygame.Surface(image.get_size(), pygame.SRCALPHA)
+    keyed.fill(colorkey + (255,))
+    keyed.blit(image, (0, 0))
+    pixels = pygame.PixelArray(keyed)
+    pixels.replace(colorkey + (255,), colorkey + (0,))
+    del pixels
+    return keyed
+
+
+# pack sizes into rows (tallest first), at most width wide
+# returns a list of (x, y) in the same order as sizes, and the total height
+def packShelves(sizes, width):
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    positions = [None] * len(sizes)
+    x = 0
+    y = 0
+    rowHeight = 0
+    for i in order:
+        w, h = sizes[i]
+        # start a new row if this one is full
+        if x + w > width:
+            x = 0
+            y += rowHeight + padding
+            rowHeight = 0
+        positions[i] = (x, y)
+        x += w + padding
+        rowHeight = max(rowHeight, h)
+    return positions, y + rowHeight
+
+
+def buildAtlas(imageFile, indexFile, width):
+    # every image to pack - (windows style path, Surface, colour key)
+    sprites = []
+    for sourceDir in sourceDirs:
+        pattern = os.path.join(*sourceDir.split('\\'), '*.png')
+        for path in sorted(glob.glob(pattern)):
+            name = sourceDir + '\\' + os.path.basename(path)
+            colorkey = sheetColorkey if path.endswith('SS.png') else None
+            image = loadSprite(path, colorkey)
+            if max(image.get_size()) > maxSpriteSize:
+                print('Skipping', name, '- too big for the atlas')
+                continue
+            sprites.append((name, path, image, colorkey))
+
+    width = max([width] + [image.get_width() for name, path, image, colorkey in sprites])
+    positions, height = packShelves(
+        [image.get_size() for name, path, image, colorkey in sprites], width)
+
+    atlas = pygame.Surface((width, height), pygame.SRCALPHA)
+    atlas.fill((0, 0, 0, 0))
+    index = {}
+    for (name, path, image, colorkey), (x, y) in zip(sprites, positions):
+        atlas.blit(image, (x, y))
+        index[name] = {
+            'rect': [x, y, image.get_width(), image.get_height()],
+            'colorkey': list(colorkey) if colorkey is not None else None,
+            'mtime': os.stat(path).st_mtime,
+        }
+
+    pygame.image.save(atlas, os.path.join(*imageFile.split('\\')))
+    with open(os.path.join(*indexFile.split('\\')), 'w') as f:
+        json.dump({'image': imageFile, 'sprites': index}, f, indent=4)
+    print('Packed %d images into a %dx%d atlas' % (len(sprites), width, height))
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Pack the sprites into one atlas image for the game.')
+    parser.add_argument('--width', type=int, default=1024,
+                        help='width of the atlas (default 1024, or the widest image)')
+    args = parser.parse_args()
+    pygame.init()
+    buildAtlas('data\\atlas.png', 'data\\atlas.json', args.width)
+
+
+if __name__ == '__main__':
+    main()
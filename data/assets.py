@@ -0,0 +1,441 @@
+# This handles loading and caching images, fonts and rendered text
+# Every image is only decoded once per process - after that the same Surface
+# is handed out to everything that asks for it, so spawning an enemy or firing
+# a bullet doesn't touch the disk.
+# Fonts are opened once per size, and rendered text is kept in a small LRU
+# cache so labels that don't change every frame only cost a blit.
+# Surfaces from the cache are shared, so don't draw onto them.
+# If the sprite atlas has been built (build_atlas.py), images and frames that
+# are in it are subsurfaces of the one atlas image instead of separate copies.
+#
+# Every image is converted to the display's pixel format as it's loaded, so
+# blitting it doesn't have to convert each pixel. Which format depends on
+# what's actually in the image:
+#   opaque - every pixel is solid, plain convert()
+#   colorkey - pixels are either solid or fully see-through (all the pixel art),
+#              convert() with a colour key and RLE, by far the fastest to blit
+#   alpha - some pixels are partly see-through, convert_alpha()
+# With checkFormats on, blit() counts every blit of a Surface that isn't in
+# the display's format in slowBlits, to find ones that skipped this.
+#
+# preload() loads a list of assets up front, decoding the files and working
+# out their formats on a thread pool (pygame lets other threads run while it
+# does) and converting them on the main thread as each one is ready.
+#
+# Paths can be written with either \ or / (the game uses windows style paths)
+
+import json
+import os
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import pygame
+
+# decoded images - (path, alpha) -> Surface
+_images = {}
+# sliced frames - (path, rects, colorkey) -> tuple of Surfaces
+_frames = {}
+# pre-rotated images - (path, steps) -> tuple of Surfaces
+_rotations = {}
+# opened fonts - (path, size) -> Font
+_fonts = {}
+# rendered text - (filename, text, size, colour) -> Surface, least recently used first
+_texts = OrderedDict()
+_textBytes = 0
+# the sprite atlas - path -> (rect in the atlas, colour key), None until loaded
+_atlas = None
+# the atlas image is only decoded the first time a sprite in it is used
+_atlasImagePath = None
+_atlasImage = None
+# files decoded by preload() that haven't been converted yet - path -> (Surface, format)
+_decoded = {}
+
+# files written by build_atlas.py
+atlasImageFile = 'data\\atlas.png'
+atlasIndexFile = 'data\\atlas.json'
+
+# colour keys to try, in order, for images that are either solid or see-through
+# one that isn't already used by a solid pixel in the image is picked
+keyColours = [(255, 0, 255), (0, 255, 255), (255, 255, 0), (1, 2, 3)]
+
+# how many images were converted to each format - format name -> count
+formatCounts = Counter()
+# if True, blit() checks the format of everything it draws (for debugging, it's slower)
+checkFormats = False
+# blits of Surfaces not in the display's format - description -> count
+slowBlits = Counter()
+# (bitsize, masks) of the display, worked out the first time it's needed
+_displayFormat = None
+
+# limits for the rendered text cache - whichever is hit first evicts the oldest text
+maxTexts = 256
+maxTextBytes = 16 * 1024 * 1024
+
+
+# turn a windows style path into one for the current os (absolute paths stay absolute)
+def resolvePath(filename):
+    return os.path.normpath(filename.replace('\\', os.sep))
+
+
+# decode an image file and work out its format - safe to run on any thread
+def _decodeFile(path):
+    image = pygame.image.load(path)
+    return image, pixelFormat(image)
+
+
+# decode an image file, or take it from preload() if it has already been decoded
+# returns (Surface, format from pixelFormat())
+def _decode(path):
+    decoded = _decoded.pop(path, None)
+    return decoded if decoded is not None else _decodeFile(path)
+
+
+# read the sprite atlas's index if it has been built - only done once, the first time it's needed
+# images changed since the atlas was built are left out, so they load from their own files
+def loadAtlas():
+    global _atlas
+    global _atlasImagePath
+    global _atlasImage
+    _atlas = {}
+    _atlasImagePath = None
+    _atlasImage = None
+    indexPath = resolvePath(atlasIndexFile)
+    if not os.path.exists(indexPath):
+        return
+    try:
+        with open(indexPath) as f:
+            index = json.load(f)
+        _atlasImagePath = resolvePath(index['image'])
+        if not os.path.exists(_atlasImagePath):
+            raise OSError('no atlas image')
+        for name, sprite in index['sprites'].items():
+            path = resolvePath(name)
+            if os.path.exists(path) and os.stat(path).st_mtime > sprite['mtime']:
+                print('Sprite changed since the atlas was built:', path)
+                continue
+            colorkey = tuple(sprite['colorkey']) if sprite['colorkey'] is not None else None
+            _atlas[path] = (pygame.Rect(sprite['rect']), colorkey)
+    except (OSError, ValueError, KeyError, TypeError, pygame.error) as e:
+        # carry on without the atlas
+        print('Unable to load sprite atlas:', indexPath, e)
+        _atlas = {}
+
+
+# decode the atlas image - returns False (and carries on without the atlas) if it can't be
+def _loadAtlasImage():
+    global _atlas
+    global _atlasImage
+    try:
+        # no RLE on the atlas itself - each subsurface gets its own (see _atlasSubsurface)
+        _atlasImage = convertImage(*_decode(_atlasImagePath), rle=False)
+    except (OSError, pygame.error) as e:
+        print('Unable to load sprite atlas:', _atlasImagePath, e)
+        _atlas = {}
+        return False
+    return True
+
+
+# where an image is in the atlas, if it's there with this colour key
+def _atlasRect(path, colorkey):
+    if _atlas is None:
+        loadAtlas()
+    sprite = _atlas.get(path)
+    if sprite is None or sprite[1] != colorkey:
+        return None
+    if _atlasImage is None and not _loadAtlasImage():
+        return None
+    return sprite[0]
+
+
+# the file that has to be decoded to load an image, or None if it's already loaded
+# colorkeys - the atlas colour keys it can be loaded from (frames can be sliced from either)
+def _sourceFile(path, colorkeys):
+    if _atlas is None:
+        loadAtlas()
+    sprite = _atlas.get(path)
+    if sprite is not None and sprite[1] in colorkeys:
+        return _atlasImagePath if _atlasImage is None else None
+    return None if (path, True) in _images else path
+
+
+# part of the atlas - with the atlas's colour key and RLE if it has one
+def _atlasSubsurface(rect):
+    image = _atlasImage.subsurface(rect)
+    colorkey = _atlasImage.get_colorkey()
+    if colorkey is not None:
+        image.set_colorkey(colorkey, pygame.RLEACCEL)
+    return image
+
+
+# work out the best format for an image from its pixels - ('opaque', None),
+# ('colorkey', colour key) or ('alpha', None)
+# this doesn't need the display, so preload() runs it on the decoding threads
+def pixelFormat(image):
+    width, height = image.get_size()
+    # masks take the image's colour key or alpha into account - solid pixels, and any that show at all
+    solid = pygame.mask.from_surface(image, 254)
+    if solid.count() == width * height:
+        return 'opaque', None
+    visible = pygame.mask.from_surface(image, 0)
+    if visible.count() == solid.count():
+        for key in keyColours:
+            # the key can't be a colour a solid pixel already has
+            keyPixels = pygame.mask.from_threshold(image, key, (1, 1, 1, 255))
+            if not keyPixels.overlap_area(solid, (0, 0)):
+                return 'colorkey', key
+    return 'alpha', None
+
+
+# convert an image to the display's format, in the format from pixelFormat()
+# rle - whether a colour keyed image is RLE encoded (not worth it for ones that get drawn onto)
+def convertImage(image, imageFormat, rle=True):
+    kind, key = imageFormat
+    formatCounts[kind] += 1
+    if kind == 'opaque':
+        return image.convert()
+    if kind == 'colorkey':
+        keyed = pygame.Surface(image.get_size()).convert()
+        keyed.fill(key)
+        # blending from the display's alpha format is a lot quicker than from whatever the file was
+        keyed.blit(image.convert_alpha() if image.get_masks()[3] else image, (0, 0))
+        keyed.set_colorkey(key, pygame.RLEACCEL if rle else 0)
+        return keyed
+    return image.convert_alpha()
+
+
+# convert an image to the display's format - opaque, colorkey or alpha depending on its pixels
+def optimiseImage(image, rle=True):
+    return convertImage(image, pixelFormat(image), rle)
+
+
+# load an image, or get it from the cache if it has been loaded before
+def loadImage(filename, alpha=True):
+    path = resolvePath(filename)
+    key = (path, alpha)
+    image = _images.get(key)
+    if image is None and alpha:
+        # the atlas only has alpha images
+        rect = _atlasRect(path, None)
+        if rect is not None:
+            image = _atlasSubsurface(rect)
+            _images[key] = image
+    if image is None:
+        try:
+            image, imageFormat = _decode(path)
+        except (pygame.error, FileNotFoundError):
+            print('Unable to load image:', path)
+            raise SystemExit
+        image = convertImage(image, imageFormat) if alpha else image.convert()
+        _images[key] = image
+    return image
+
+
+# copy one rectangle out of a sheet onto its own Surface
+# the sheet is drawn onto black, so the frame is opaque unless it has a colour key
+def sliceImage(sheet, rectangle, colorkey=None):
+    rect = pygame.Rect(rectangle)
+    image = pygame.Surface(rect.size).convert()
+    image.blit(sheet, (0, 0), rect)
+    if colorkey is not None:
+        if colorkey == -1:
+            colorkey = image.get_at((0, 0))
+        image.set_colorkey(colorkey, pygame.RLEACCEL)
+        formatCounts['colorkey'] += 1
+    else:
+        formatCounts['opaque'] += 1
+    return image
+
+
+# slice a list of rectangles out of an image, or get them from the cache
+# returns a tuple of Surfaces in the same order as rects
+def loadFrames(filename, rects, colorkey=None):
+    path = resolvePath(filename)
+    rects = tuple(tuple(rect) for rect in rects)
+    if colorkey is not None and colorkey != -1:
+        colorkey = tuple(colorkey)
+    key = (path, rects, colorkey)
+    frames = _frames.get(key)
+    if frames is None:
+        frames = _atlasFrames(path, rects, colorkey)
+    if frames is None:
+        sheet = loadImage(path)
+        frames = tuple(sliceImage(sheet, rect, colorkey) for rect in rects)
+    _frames[key] = frames
+    return frames
+
+
+# frames as subsurfaces of the atlas - the atlas already has the colour key applied
+# returns None if the sheet isn't in the atlas with this colour key
+def _atlasFrames(path, rects, colorkey):
+    sheetRect = _atlasRect(path, colorkey)
+    if sheetRect is None:
+        return None
+    frames = []
+    for rect in rects:
+        rect = pygame.Rect(rect)
+        if not sheetRect.contains(rect.move(sheetRect.topleft)):
+            # a frame that goes off the sheet - let sliceImage deal with it
+            return None
+        frames.append(_atlasSubsurface(rect.move(sheetRect.topleft)))
+    return tuple(frames)
+
+
+# rotate an image to steps evenly spaced angles, or get them from the cache
+# frame i is rotated anticlockwise by i * 360 / steps degrees
+def loadRotations(filename, steps):
+    path = resolvePath(filename)
+    key = (path, steps)
+    frames = _rotations.get(key)
+    if frames is None:
+        # rotated with per pixel alpha so the corners come out see-through even if the image is opaque
+        image = loadImage(path).convert_alpha()
+        frames = tuple(optimiseImage(pygame.transform.rotate(image, i * 360 / steps))
+                       for i in range(steps))
+        _rotations[key] = frames
+    return frames
+
+
+# get the frame from loadRotations that is closest to an angle in degrees
+def rotationIndex(angle, steps):
+    return round(angle * steps / 360) % steps
+
+
+# the file an item passed to preload() needs decoding, if any
+def _itemSource(item):
+    kind = item[0]
+    path = resolvePath(item[1])
+    if kind == 'image':
+        alpha = item[2] if len(item) > 2 else True
+        if not alpha:
+            return None if (path, False) in _images else path
+        return _sourceFile(path, (None,))
+    if kind == 'frames':
+        colorkey = tuple(item[3]) if len(item) > 3 and item[3] not in (None, -1) else None
+        return _sourceFile(path, (colorkey, None))
+    if kind == 'rotations':
+        return _sourceFile(path, (None,))
+    if kind == 'font':
+        return None
+    raise ValueError('unknown asset type: ' + kind)
+
+
+def _loadItem(item):
+    kind = item[0]
+    if kind == 'image':
+        loadImage(*item[1:])
+    elif kind == 'frames':
+        loadFrames(*item[1:])
+    elif kind == 'rotations':
+        loadRotations(*item[1:])
+    else:
+        loadFont(*item[1:])
+
+
+# load a list of assets into the cache, decoding the image files on a thread pool
+# items - ('image', filename[, alpha]), ('frames', filename, rects[, colorkey]),
+#         ('rotations', filename, steps) or ('font', filename, size)
+# they're converted in order on this thread (Surfaces can only be converted on the
+# main thread), each as soon as its file has been decoded
+# progress - called with (items loaded, total items) after each one, e.g. to draw a loading screen
+def preload(items, progress=None, workers=4):
+    sources = [_itemSource(item) for item in items]
+    futures = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for source in sources:
+            if source is not None and source not in futures:
+                futures[source] = executor.submit(_decodeFile, source)
+        for done, (item, source) in enumerate(zip(items, sources), 1):
+            future = futures.pop(source, None)
+            if future is not None:
+                try:
+                    _decoded[source] = future.result()
+                except (pygame.error, FileNotFoundError):
+                    # loading it below tries again and says what went wrong
+                    pass
+            _loadItem(item)
+            if progress is not None:
+                progress(done, len(items))
+
+
+# whether blitting a Surface onto the display needs its pixels converting
+def isDisplayFormat(surface):
+    global _displayFormat
+    if _displayFormat is None:
+        display = pygame.display.get_surface()
+        if display is None:
+            return True
+        _displayFormat = (display.get_bitsize(), display.get_masks())
+    bitsize, masks = _displayFormat
+    surfaceMasks = surface.get_masks()
+    if surfaceMasks[3]:
+        # per pixel alpha is fine as long as it's what convert_alpha() gives - not with a colour key too
+        return (surface.get_colorkey() is None and surface.get_bitsize() == 32
+                and surfaceMasks[:3] == masks[:3])
+    return surface.get_bitsize() == bitsize and surfaceMasks == masks
+
+
+# blit a Surface, counting it in slowBlits if checkFormats is on and it isn't in the display's format
+# returns the rect drawn on, like Surface.blit
+def blit(target, surface, position, area=None):
+    if checkFormats and not isDisplayFormat(surface):
+        slowBlits['%dx%d %dbit%s' % (surface.get_width(), surface.get_height(), surface.get_bitsize(),
+                                     ' alpha' if surface.get_masks()[3] else '')] += 1
+    return target.blit(surface, position, area)
+
+
+# open a font at a size, or get it from the cache if it has been opened before
+def loadFont(filename, size):
+    path = resolvePath(filename)
+    key = (path, size)
+    font = _fonts.get(key)
+    if font is None:
+        try:
+            font = pygame.font.Font(path, size)
+        except (pygame.error, FileNotFoundError):
+            print('Unable to load font:', path)
+            raise SystemExit
+        _fonts[key] = font
+    return font
+
+
+# render some text, or get it from the cache if it was rendered recently
+def renderText(filename, text, size, colour):
+    global _textBytes
+    key = (filename, text, size, tuple(colour))
+    textSurface = _texts.get(key)
+    if textSurface is not None:
+        # mark as most recently used
+        _texts.move_to_end(key)
+        return textSurface
+
+    textSurface = loadFont(filename, size).render(text, True, colour)
+    _texts[key] = textSurface
+    _textBytes += _surfaceBytes(textSurface)
+    # evict the least recently used text until back under the limits
+    while len(_texts) > 1 and (len(_texts) > maxTexts or _textBytes > maxTextBytes):
+        _, oldSurface = _texts.popitem(last=False)
+        _textBytes -= _surfaceBytes(oldSurface)
+    return textSurface
+
+
+def _surfaceBytes(surface):
+    return surface.get_height() * surface.get_pitch()
+
+
+# empty the cache (the Surfaces already handed out stay valid)
+def clearCache():
+    global _textBytes
+    global _atlas
+    global _atlasImagePath
+    global _atlasImage
+    global _displayFormat
+    _images.clear()
+    _frames.clear()
+    _rotations.clear()
+    _fonts.clear()
+    _texts.clear()
+    _textBytes = 0
+    _atlas = None
+    _atlasImagePath = None
+    _atlasImage = None
+    _decoded.clear()
+    _displayFormat = None
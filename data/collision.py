@@ -0,0 +1,97 @@
+# This handles the broad phase of collision detection
+# Instead of checking every bullet against every enemy, objects are put into a
+# grid of square cells (a spatial hash) each tick, and a rect only gets checked
+# against the objects in the cells it overlaps.
+# Anything put into the grid needs a pygame.Rect called rect.
+#
+# RectList does the same job with pygame's Rect.collidelistall, which checks
+# every object but does it in C - it's the fallback when the grid isn't worth
+# it (very few objects, or objects spread over the whole screen).
+
+from collections import defaultdict
+
+
+class SpatialHash(object):
+    def __init__(self, cellSize=128):
+        # cellSize should be about the size of the biggest object in the grid
+        self.cellSize = cellSize
+        # (cellX, cellY) -> list of objects overlapping that cell
+        self.cells = defaultdict(list)
+
+    # empty the grid
+    def clear(self):
+        self.cells.clear()
+
+    # empty the grid and put every object in it
+    def build(self, objects):
+        self.cells.clear()
+        for obj in objects:
+            self.insert(obj)
+
+    # put an object in every cell its rect overlaps
+    def insert(self, obj):
+        rect = obj.rect
+        # rects with no size can't collide with anything
+        if rect.width <= 0 or rect.height <= 0:
+            return
+        size = self.cellSize
+        cells = self.cells
+        for cellX in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cellY in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                cells[(cellX, cellY)].append(obj)
+
+    # get every object in the grid whose rect collides with rect
+    def query(self, rect):
+        if rect.width <= 0 or rect.height <= 0:
+            return []
+        size = self.cellSize
+        cells = self.cells
+        found = []
+        seen = set()
+        for cellX in range(rect.left // size, (rect.right - 1) // size + 1):
+            for cellY in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                cell = cells.get((cellX, cellY))
+                if cell is None:
+                    continue
+                for obj in cell:
+                    # objects bigger than a cell can be in more than one cell
+                    if id(obj) not in seen and rect.colliderect(obj.rect):
+                        seen.add(id(obj))
+                        found.append(obj)
+        return found
+
+
+# same interface as SpatialHash, but query() checks every object with
+# pygame's Rect.collidelistall, which loops in C instead of Python
+class RectList(object):
+    def __init__(self):
+        self.objects = []
+        self.rects = []
+
+    # empty the list
+    def clear(self):
+        self.objects = []
+        self.rects = []
+
+    # empty the list and put every object in it
+    def build(self, objects):
+        self.objects = list(objects)
+        self.rects = [obj.rect for obj in self.objects]
+
+    def insert(self, obj):
+        self.objects.append(obj)
+        self.rects.append(obj.rect)
+
+    # get every object in the list whose rect collides with rect
+    def query(self, rect):
+        objects = self.objects
+        return [objects[i] for i in rect.collidelistall(self.rects)]
+
+
+# make the broad phase for a collision mode - "grid" or "batch"
+def makeBroadPhase(mode, cellSize=128):
+    if mode == "grid":
+        return SpatialHash(cellSize)
+    elif mode == "batch":
+        return RectList()
+    raise ValueError('Unknown collision mode: ' + repr(mode))
@@ -0,0 +1,76 @@
+# This class plays short one-off animations (enemy deaths) that aren't part of the game
+# When an enemy dies it hands its death animation to the effects and leaves the
+# enemies list straight away, so the simulation doesn't keep walking, moving and
+# colliding dead enemies while the animation plays out.
+# Each effect is just a frame strip (a list of Surfaces shared by every effect
+# of the same kind), a position and how far through the strip it is. They're
+# kept in fixed size lists - the first count entries are playing, and a finished
+# effect is swapped with the last playing one, so nothing is allocated per effect.
+# If every slot is taken, new effects aren't played.
+
+
+class EffectPool(object):
+    def __init__(self, capacity=512, ticksPerFrame=3):
+        # capacity - most effects playing at once
+        # ticksPerFrame - how many ticks each frame of a strip is shown for
+        self.capacity = capacity
+        self.ticksPerFrame = ticksPerFrame
+        self.strips = [None] * capacity
+        self.xs = [0] * capacity
+        self.ys = [0] * capacity
+        # ticks since each effect started
+        self.ticks = [0] * capacity
+        # number of effects playing
+        self.count = 0
+        # how many effects weren't played because it was full (for checking the capacity)
+        self.dropped = 0
+
+    # start playing a strip with its top left at (x, y) - returns False if it's full
+    def spawn(self, strip, x, y):
+        if self.count == self.capacity:
+            self.dropped += 1
+            return False
+        index = self.count
+        self.strips[index] = strip
+        self.xs[index] = x
+        self.ys[index] = y
+        self.ticks[index] = 0
+        self.count += 1
+        return True
+
+    # move every effect on a tick, and take out the finished ones - call once a tick
+    def update(self):
+        strips = self.strips
+        ticks = self.ticks
+        ticksPerFrame = self.ticksPerFrame
+        index = 0
+        while index < self.count:
+            ticks[index] += 1
+            # finished - the last frame is shown for one tick less than the others
+            if ticks[index] + 1 >= len(strips[index]) * ticksPerFrame:
+                self.count -= 1
+                last = self.count
+                strips[index] = strips[last]
+                self.xs[index] = self.xs[last]
+                self.ys[index] = self.ys[last]
+                ticks[index] = ticks[last]
+                # don't keep the strip alive once it's not used
+                strips[last] = None
+            else:
+                index += 1
+
+    # the frame each effect is showing - a tuple of (Surface, (x, y), alpha) like the other sprites
+    def sprites(self):
+        ticksPerFrame = self.ticksPerFrame
+        return tuple((self.strips[index][self.ticks[index] // ticksPerFrame],
+                      (self.xs[index], self.ys[index]), None)
+                     for index in range(self.count))
+
+    # stop every effect
+    def clear(self):
+        for index in range(self.count):
+            self.strips[index] = None
+        self.count = 0
+
+    def __len__(self):
+        return self.count
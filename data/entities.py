@@ -0,0 +1,72 @@
+# This class holds a list of entities (bullets, enemies)
+# Removing from a normal list is slow (list.index searches the whole list and
+# pop shifts everything after it) and removing while looping over the list
+# makes the loop skip the next item.
+# EntityList fixes both - remove() only marks the entity as removed, which is
+# O(1), and removed entities are skipped when looping over the list.
+# compact() should be called once at the end of each tick to actually take
+# them out, by swapping each one with the last entity (so the order of the
+# list isn't kept).
+# onRemove, if given, is called with each entity as it is taken out.
+
+
+class EntityList(object):
+    def __init__(self, onRemove=None):
+        self.onRemove = onRemove
+        # the entities, including ones waiting to be removed
+        self.items = []
+        # id(entity) -> index in items
+        self.slots = {}
+        # id(entity) -> entity, for entities waiting to be removed
+        self.removed = {}
+
+    def append(self, entity):
+        self.slots[id(entity)] = len(self.items)
+        self.items.append(entity)
+
+    # mark an entity to be removed at the end of the tick
+    # does nothing if the entity isn't in the list or was already removed
+    def remove(self, entity):
+        key = id(entity)
+        if key in self.slots:
+            self.removed[key] = entity
+
+    # actually take the removed entities out of the list
+    def compact(self):
+        items = self.items
+        slots = self.slots
+        onRemove = self.onRemove
+        for key, entity in self.removed.items():
+            if onRemove is not None:
+                onRemove(entity)
+            index = slots.pop(key)
+            last = items.pop()
+            # move the last entity into the gap (unless it was the one removed)
+            if index < len(items):
+                items[index] = last
+                slots[id(last)] = index
+        self.removed.clear()
+
+    # remove everything straight away
+    def clear(self):
+        if self.onRemove is not None:
+            for entity in self.items:
+                self.onRemove(entity)
+        self.items.clear()
+        self.slots.clear()
+        self.removed.clear()
+
+    def __contains__(self, entity):
+        key = id(entity)
+        return key in self.slots and key not in self.removed
+
+    def __len__(self):
+        return len(self.items) - len(self.removed)
+
+    # loops over the entities that haven't been removed
+    # entities appended during the loop are included, like a normal list
+    def __iter__(self):
+        removed = self.removed
+        for entity in self.items:
+            if not removed or id(entity) not in removed:
+                yield entity
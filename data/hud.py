@@ -0,0 +1,41 @@
+# This class is a cached layer of the hud (the hearts, the wave bar, the death screen...)
+# Drawing a widget can take a lot of blits and text lookups, but most frames
+# nothing on it has changed. A Layer draws its widget once onto its own Surface
+# and then just blits that Surface every frame, until one of the inputs it was
+# drawn with (health, score, wave, mouse hover...) changes.
+#
+# render is a function that takes the inputs and returns (Surface, (x, y)) -
+# the widget and where on the screen it goes.
+
+from data import assets
+
+
+class Layer(object):
+    def __init__(self, render):
+        self.render = render
+        # the inputs the cached Surface was drawn with
+        self.inputs = None
+        self.surface = None
+        self.position = (0, 0)
+        # how many times the widget has been drawn (for checking the cache works)
+        self.renders = 0
+
+    # draw the widget again if the inputs changed
+    # inputs - tuple of everything the widget depends on
+    # returns (Surface, (x, y)) - the widget and where it goes
+    def update(self, inputs):
+        if self.surface is None or inputs != self.inputs:
+            self.surface, self.position = self.render(*inputs)
+            self.inputs = inputs
+            self.renders += 1
+        return self.surface, self.position
+
+    # draw the layer onto target, drawing the widget again first if the inputs changed
+    # returns the rect drawn on
+    def draw(self, target, inputs):
+        surface, position = self.update(inputs)
+        return assets.blit(target, surface, position)
+
+    # draw the widget again next time, even if the inputs are the same
+    def invalidate(self):
+        self.surface = None
@@ -0,0 +1,81 @@
+# This class keeps track of the keyboard and mouse
+# The event queue is emptied once a frame into update(), which returns an
+# InputSnapshot - what is held down, and what was pressed or released since
+# the last one. Everything that needs input (shooting, the menu buttons, the
+# death screen) reads the snapshot instead of asking pygame again, so there's
+# one SDL call a frame rather than several per button.
+# Presses are edges: a click is only in the snapshot of the frame it happened
+# in, so holding the mouse button down over a button only clicks it once.
+
+from collections import namedtuple
+
+import pygame
+
+
+class InputSnapshot(namedtuple('InputSnapshot', ['held', 'pressed', 'released', 'mousePos',
+                                                 'mouseHeld', 'clicks', 'quit', 'events'])):
+    # held - frozenset of keys held down
+    # pressed, released - frozensets of keys pressed or let go since the last snapshot
+    # mousePos - where the mouse is, mouseHeld - if the left button is down
+    # clicks - positions the left button was pressed at since the last snapshot
+    # quit - if the window was closed
+    # events - tuple of the events the snapshot was made from, in order
+    __slots__ = ()
+
+    # was the left button pressed inside a rect - x, y is the top left
+    def clickedIn(self, x, y, width, height):
+        for clickX, clickY in self.clicks:
+            if x + width > clickX > x and y + height > clickY > y:
+                return True
+        return False
+
+    # is the mouse over a rect - x, y is the top left
+    def mouseIn(self, x, y, width, height):
+        return x + width > self.mousePos[0] > x and y + height > self.mousePos[1] > y
+
+
+class InputState(object):
+    def __init__(self, mousePos=(0, 0)):
+        self.held = set()
+        self.mousePos = mousePos
+        self.mouseHeld = False
+        # the latest snapshot
+        self.snapshot = InputSnapshot(frozenset(), frozenset(), frozenset(), mousePos,
+                                      False, (), False, ())
+
+    # take a frame's events (pygame.event.get()) and return the new snapshot
+    def update(self, events):
+        pressed = set()
+        released = set()
+        clicks = []
+        quit = False
+        for event in events:
+            if event.type == pygame.KEYDOWN:
+                self.held.add(event.key)
+                pressed.add(event.key)
+            elif event.type == pygame.KEYUP:
+                self.held.discard(event.key)
+                released.add(event.key)
+            elif event.type == pygame.MOUSEMOTION:
+                self.mousePos = event.pos
+            elif event.type == pygame.MOUSEBUTTONDOWN:
+                self.mousePos = event.pos
+                if event.button == 1:
+                    self.mouseHeld = True
+                    clicks.append(event.pos)
+            elif event.type == pygame.MOUSEBUTTONUP:
+                self.mousePos = event.pos
+                if event.button == 1:
+                    self.mouseHeld = False
+            elif event.type == pygame.WINDOWFOCUSLOST:
+                # the key ups can be missed while the window is in the background, so let go of everything
+                released.update(self.held)
+                self.held.clear()
+                self.mouseHeld = False
+            elif event.type == pygame.QUIT:
+                quit = True
+        self.snapshot = InputSnapshot(frozenset(self.held), frozenset(pressed), frozenset(released),
+                                      self.mousePos, self.mouseHeld, tuple(clicks), quit,
+                                      tuple(events))
+        return self.snapshot
+
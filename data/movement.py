@@ -0,0 +1,153 @@
+# This handles moving enemies and bullets with NumPy
+# Positions, velocities and speeds of everything that moves are kept in
+# arrays (one array per value, one slot per entity) so the whole lot can be
+# moved with a few array operations per tick instead of some maths per object.
+# After each step the new positions are copied back onto the entities, so
+# drawing and collisions still just use entity.x and entity.y.
+#
+# There are 3 kinds of mover:
+# FIXED - moves in a straight line (bullets) and is culled once off screen
+# FOLLOW - moves towards the target every tick (enemies)
+# FOLLOW_UNTIL_RANGE - like FOLLOW, but stops for good once it is on screen
+#   and within its stop range of the target (chips enemies)
+#
+# NumPy is optional - if it isn't installed available is False and the game
+# moves everything one object at a time instead.
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+available = np is not None
+
+FIXED = 0
+FOLLOW = 1
+FOLLOW_UNTIL_RANGE = 2
+
+
+class MovementSystem(object):
+    def __init__(self, capacity=256):
+        # number of slots in use
+        self.count = 0
+        # slot -> entity
+        self.entities = []
+        self.allocate(capacity)
+
+    # make the arrays (keeping what is in them) with room for capacity entities
+    def allocate(self, capacity):
+        old = self.count
+        for name, dtype in (('x', np.float64), ('y', np.float64),
+                            ('vx', np.float64), ('vy', np.float64),
+                            ('speed', np.float64), ('stopRange', np.float64),
+                            ('kind', np.int8), ('moving', np.bool_)):
+            array = np.zeros(capacity, dtype)
+            if old:
+                array[:old] = getattr(self, name)[:old]
+            setattr(self, name, array)
+        self.capacity = capacity
+
+    # start moving an entity
+    # vx, vy - velocity for FIXED movers
+    # speed - speed towards the target for FOLLOW movers
+    def add(self, entity, kind, vx=0.0, vy=0.0, speed=0.0, stopRange=-1.0):
+        if self.count == self.capacity:
+            self.allocate(self.capacity * 2)
+        slot = self.count
+        self.x[slot] = entity.x
+        self.y[slot] = entity.y
+        self.vx[slot] = vx
+        self.vy[slot] = vy
+        self.speed[slot] = speed
+        self.stopRange[slot] = stopRange
+        self.kind[slot] = kind
+        self.moving[slot] = True
+        self.entities.append(entity)
+        entity.moveSlot = slot
+        self.count += 1
+
+    # stop moving an entity - does nothing if it isn't being moved
+    def remove(self, entity):
+        slot = entity.moveSlot
+        if slot is None:
+            return
+        entity.moveSlot = None
+        last = self.count - 1
+        lastEntity = self.entities.pop()
+        # move the last slot into the gap (unless it was the one removed)
+        if slot != last:
+            for array in (self.x, self.y, self.vx, self.vy, self.speed,
+                          self.stopRange, self.kind, self.moving):
+                array[slot] = array[last]
+            self.entities[slot] = lastEntity
+            lastEntity.moveSlot = slot
+        self.count = last
+
+    # move everything one tick
+    # targetX, targetY - where FOLLOW movers move towards (the player)
+    # width, height - the screen size, FIXED movers outside it are culled
+    # margin - how far inside the screen FOLLOW_UNTIL_RANGE movers must be to stop
+    # returns (culled, stopped) - lists of entities that went off screen,
+    # and FOLLOW_UNTIL_RANGE entities that stopped this tick
+    def step(self, targetX, targetY, width, height, margin=75):
+        n = self.count
+        if n == 0:
+            return [], []
+        x = self.x[:n]
+        y = self.y[:n]
+        vx = self.vx[:n]
+        vy = self.vy[:n]
+        kind = self.kind[:n]
+        moving = self.moving[:n]
+        entities = self.entities
+
+        # cull fixed movers that have left the screen (checked before moving)
+        fixed = kind == FIXED
+        culledMask = fixed & ~((x < width) & (x > 0) & (y < height) & (y > 0))
+        culled = []
+        if culledMask.any():
+            culled = [entities[i] for i in culledMask.nonzero()[0]]
+            moving &= ~culledMask
+
+        # point followers at the target
+        followers = ~fixed
+        stopped = []
+        if followers.any():
+            difX = targetX - x
+            difY = targetY - y
+            dist = np.hypot(difX, difY)
+            # don't divide by 0 if an enemy is right on the target
+            dist[dist == 0] = 1.0
+            scale = self.speed[:n] / dist
+            np.copyto(vx, difX * scale, where=followers)
+            np.copyto(vy, difY * scale, where=followers)
+
+            # stop chips enemies that are on screen and in range
+            stoppedMask = (kind == FOLLOW_UNTIL_RANGE) & moving
+            if stoppedMask.any():
+                stoppedMask &= ((dist <= self.stopRange[:n]) &
+                                (x >= margin) & (x <= width - margin) &
+                                (y >= margin) & (y <= height - margin))
+                if stoppedMask.any():
+                    stopped = [entities[i] for i in stoppedMask.nonzero()[0]]
+                    moving &= ~stoppedMask
+
+        # move
+        x += vx * moving
+        y += vy * moving
+
+        return culled, stopped
+
+    # copy positions back onto the entities
+    # followers also get their facing direction updated
+    # (facing right if the target is to the right of them)
+    def sync(self, targetX):
+        n = self.count
+        facingRight = (targetX >= self.x[:n]).tolist()
+        for entity, x, y, kind, right in zip(self.entities, self.x[:n].tolist(),
+                                             self.y[:n].tolist(),
+                                             self.kind[:n].tolist(), facingRight):
+            entity.x = x
+            entity.y = y
+            if kind != FIXED:
+                entity.facingDirection = "right" if right else "left"
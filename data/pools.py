@@ -0,0 +1,44 @@
+# This class keeps a pool of objects to reuse instead of making new ones
+# Making an enemy means making a new object, its rects and its lists, and
+# during a spawn burst that's a lot of allocating (and garbage collecting once
+# they die). A pool keeps the objects that are finished with and hands them
+# out again - acquire() resets a free object with reset(*args) if there is
+# one, otherwise it makes a new one with factory(*args).
+# Objects must have a reset method that takes the same arguments as factory
+# and puts them back how a new object would be.
+
+
+class ObjectPool(object):
+    def __init__(self, factory, maxFree=256):
+        # factory - makes a new object, e.g. the class itself
+        # maxFree - most free objects to keep, any more are left to be freed
+        self.factory = factory
+        self.maxFree = maxFree
+        # objects waiting to be reused
+        self.free = []
+        # how many objects have been made and reused (for checking the pool works)
+        self.made = 0
+        self.reused = 0
+
+    # get an object - a reused one if there are any free
+    def acquire(self, *args):
+        if self.free:
+            obj = self.free.pop()
+            obj.reset(*args)
+            self.reused += 1
+        else:
+            obj = self.factory(*args)
+            self.made += 1
+        return obj
+
+    # give an object back to be reused - it mustn't be used again until acquired
+    def release(self, obj):
+        if len(self.free) < self.maxFree:
+            self.free.append(obj)
+
+    # forget all the free objects
+    def clear(self):
+        self.free.clear()
+
+    def __len__(self):
+        return len(self.free)
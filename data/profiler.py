@@ -0,0 +1,136 @@
+# This class times what each part of a frame takes
+# Named scopes (events, each simulation phase, each draw pass, the display
+# update) are timed every frame while the profiler is enabled, and the last
+# window frames are kept so the overlay can show averages.
+# It can also write every frame to a trace file (.csv or .json) so a stutter
+# can be looked at afterwards - each row is the frame's total time, the time
+# of each scope and the entity counts passed to endFrame().
+# When it's disabled nothing is timed, so leaving the hooks in costs nothing.
+
+import csv
+import json
+import time
+from collections import deque
+
+
+class Profiler(object):
+    def __init__(self, window=120):
+        # window - number of frames the averages are worked out over
+        self.showOverlay = False
+        self.window = window
+        # scope name -> seconds spent in it this frame
+        self.current = {}
+        # the last window frames - (frame seconds, {scope: seconds}, {counter: value})
+        self.frames = deque(maxlen=window)
+        self.lastFrameEnd = None
+        # trace file being written, if any
+        self.traceFile = None
+        self.traceWriter = None
+        self.traceRows = None
+        self.traceScopes = []
+        self.traceColumns = None
+        self.frameCount = 0
+
+    # only time anything if something is going to use it
+    @property
+    def enabled(self):
+        return self.showOverlay or self.traceFile is not None
+
+    # run a function and add the time it took to a scope
+    def run(self, name, function):
+        start = time.perf_counter()
+        function()
+        self.current[name] = self.current.get(name, 0) + time.perf_counter() - start
+
+    # time a block of code - with profiler.scope("events"): ...
+    def scope(self, name):
+        return _Scope(self, name)
+
+    # finish the frame - counters is a dictionary of things to record (entity counts)
+    def endFrame(self, counters=None):
+        now = time.perf_counter()
+        if not self.enabled:
+            self.current = {}
+            self.lastFrameEnd = None
+            return
+        counters = counters or {}
+        if self.lastFrameEnd is not None:
+            frameTime = now - self.lastFrameEnd
+            self.frames.append((frameTime, self.current, counters))
+            if self.traceFile is not None:
+                self.writeTraceRow(frameTime, self.current, counters)
+        self.frameCount += 1
+        self.lastFrameEnd = now
+        self.current = {}
+
+    # frames per second over the window
+    def fps(self):
+        total = sum(frame[0] for frame in self.frames)
+        return len(self.frames) / total if total > 0 else 0
+
+    # average milliseconds per frame of each scope over the window, in the order they first ran
+    def averages(self):
+        totals = {}
+        for frameTime, scopes, counters in self.frames:
+            for name, seconds in scopes.items():
+                totals[name] = totals.get(name, 0) + seconds
+        return {name: seconds / len(self.frames) * 1000 for name, seconds in totals.items()}
+
+    # the counters from the last frame
+    def counters(self):
+        return self.frames[-1][2] if self.frames else {}
+
+    # start writing every frame to a file - csv if it ends in .csv, otherwise json
+    # scopeNames - every scope that can run, so frames where one didn't run still have a column for it
+    def startTrace(self, filename, scopeNames=()):
+        self.stopTrace()
+        self.traceFile = open(filename, 'w', newline='')
+        self.traceScopes = list(scopeNames)
+        self.traceColumns = None
+        if filename.endswith('.csv'):
+            self.traceWriter = csv.writer(self.traceFile)
+        else:
+            self.traceRows = []
+
+    def writeTraceRow(self, frameTime, scopes, counters):
+        row = {'frame': self.frameCount, 'frameMs': frameTime * 1000}
+        for name in self.traceScopes:
+            row[name + 'Ms'] = 0
+        for name, seconds in scopes.items():
+            row[name + 'Ms'] = seconds * 1000
+        row.update(counters)
+        if self.traceRows is not None:
+            self.traceRows.append(row)
+            return
+        # the csv columns are fixed by the first frame
+        if self.traceColumns is None:
+            self.traceColumns = list(row)
+            self.traceWriter.writerow(self.traceColumns)
+        self.traceWriter.writerow([row.get(column, '') for column in self.traceColumns])
+
+    # finish the trace file
+    def stopTrace(self):
+        if self.traceFile is None:
+            return
+        if self.traceRows is not None:
+            json.dump(self.traceRows, self.traceFile, indent=1)
+        self.traceFile.close()
+        self.traceFile = None
+        self.traceWriter = None
+        self.traceRows = None
+
+
+class _Scope(object):
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter() if self.profiler.enabled else None
+
+    def __exit__(self, *exc):
+        if self.start is not None:
+            current = self.profiler.current
+            current[self.name] = current.get(self.name, 0) + time.perf_counter() - self.start
@@ -0,0 +1,60 @@
+# This handles getting frames onto the screen
+# By default every frame clears the whole display and pushes the whole
+# framebuffer to the screen.
+# With dirty rects enabled, only the areas that were drawn on last frame are
+# restored from a cached background, and only the areas drawn on last frame
+# and this frame are pushed to the screen.
+# Anything drawn needs its rect passed to add() for this to work - blit() and
+# pygame.draw functions return the rect they changed.
+
+import pygame
+
+
+class Renderer(object):
+    def __init__(self, display, background, dirtyRects=False):
+        # display - the display Surface
+        # background - colour the screen is cleared to
+        # dirtyRects - if True, only redraw and update the changed parts of the screen
+        self.display = display
+        self.dirtyRects = dirtyRects
+        self.background = pygame.Surface(display.get_size()).convert()
+        self.background.fill(background)
+        # rects drawn on last frame and this frame
+        self.lastRects = []
+        self.rects = []
+        # for when the whole screen needs to be redrawn (first frame, menus)
+        self.fullRedraw = True
+        # if the whole screen was redrawn last frame it needs clearing this frame too
+        self.lastFull = True
+        self.clearedAll = True
+
+    # clear the screen for a new frame
+    def clear(self):
+        self.clearedAll = not self.dirtyRects or self.fullRedraw or self.lastFull
+        if self.clearedAll:
+            self.display.blit(self.background, (0, 0))
+        else:
+            # only paint the background back over last frame's sprites
+            for rect in self.lastRects:
+                self.display.blit(self.background, rect, rect)
+
+    # mark a rect that has been drawn on this frame
+    def add(self, rect):
+        if self.dirtyRects and rect is not None:
+            self.rects.append(rect)
+
+    # redraw and update the whole screen this frame
+    def invalidate(self):
+        self.fullRedraw = True
+
+    # push the frame to the screen
+    def update(self):
+        if self.clearedAll or self.fullRedraw:
+            pygame.display.update()
+        else:
+            # last frame's rects have been cleared, this frame's rects have been drawn
+            pygame.display.update(self.lastRects + self.rects)
+        self.lastFull = self.fullRedraw
+        self.lastRects = self.rects
+        self.rects = []
+        self.fullRedraw = False
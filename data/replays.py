@@ -0,0 +1,80 @@
+# This handles replay files - recordings of everything the player did in a session
+# The game is deterministic: given the same random seed, and the same inputs
+# on the same ticks, it plays out exactly the same. So a replay only needs
+# the seed and a list of inputs, each tagged with the tick it happened on.
+# headless.py can then play it back as fast as the CPU allows.
+#
+# File layout (little endian):
+#   header - magic b'TACO', version, random seed, display width and height, tick rate
+#   records - tick, kind, a, b - one for every input (see the kinds below)
+# The last record is END, on the tick the recording stopped, with the final
+# score and wave so playback can check it came out the same. If the game
+# crashed before writing it, the replay still loads and just ends after the
+# last input (with score and waveNumber None).
+
+import struct
+from collections import namedtuple
+
+magic = b'TACO'
+version = 1
+headerFormat = struct.Struct('<4sBIHHH')
+recordFormat = struct.Struct('<IBii')
+
+# record kinds
+END = 0  # a = score, b = wave number
+KEYDOWN = 1  # a = key
+KEYUP = 2  # a = key
+SHOOT = 3  # a = 1 if shoot is held down, 0 if released
+PLAY = 4  # play or respawn was clicked
+MENU = 5  # quit to menu was clicked
+MOUSEDOWN = 6  # a, b = mouse position
+MOUSEUP = 7  # a, b = mouse position
+
+# a loaded replay - records is a list of (tick, kind, a, b) in the order they happened
+Replay = namedtuple('Replay', ['seed', 'width', 'height', 'tickRate', 'records', 'endTick',
+                               'score', 'waveNumber'])
+
+
+class ReplayRecorder(object):
+    def __init__(self, filename, seed, width, height, tickRate):
+        self.filename = filename
+        self.file = open(filename, 'wb')
+        self.file.write(headerFormat.pack(magic, version, seed, width, height, tickRate))
+
+    # add an input that happened before tick
+    def record(self, tick, kind, a=0, b=0):
+        if self.file is not None:
+            self.file.write(recordFormat.pack(tick, kind, a, b))
+
+    # finish the file - tick is the number of ticks that were run
+    def close(self, tick, score, waveNumber):
+        if self.file is None:
+            return
+        self.record(tick, END, score, waveNumber)
+        self.file.close()
+        self.file = None
+
+
+# read a replay file - raises ValueError if it isn't one
+def loadReplay(filename):
+    with open(filename, 'rb') as f:
+        data = f.read()
+    if len(data) < headerFormat.size:
+        raise ValueError('not a replay file: ' + filename)
+    fileMagic, fileVersion, seed, width, height, tickRate = headerFormat.unpack_from(data)
+    if fileMagic != magic:
+        raise ValueError('not a replay file: ' + filename)
+    if fileVersion != version:
+        raise ValueError('unsupported replay version %d: %s' % (fileVersion, filename))
+
+    # leave off a record that was only partly written
+    body = data[headerFormat.size:]
+    body = body[:len(body) - len(body) % recordFormat.size]
+    records = list(recordFormat.iter_unpack(body))
+    if records and records[-1][1] == END:
+        endTick, kind, score, waveNumber = records.pop()
+    else:
+        endTick = records[-1][0] + 1 if records else 0
+        score = None
+        waveNumber = None
+    return Replay(seed, width, height, tickRate, records, endTick, score, waveNumber)
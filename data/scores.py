@@ -0,0 +1,96 @@
+# This class keeps the highscore and leaderboard
+# They are read from their files once when the game starts and kept in memory,
+# so the death screen doesn't have to read highscore.txt every frame.
+# When a score is added the files are written on a background thread, so the
+# game never waits for the disk. Each file is written to a temporary file
+# first and then renamed over the old one, so a crash part way through a write
+# can't leave a half-written (and unreadable) file behind.
+#
+# highscore.txt - just the highscore, as it always has been
+# leaderboard file - json list of the best maxEntries scores, best first
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+
+class ScoreStore(object):
+    def __init__(self, highscoreFile, leaderboardFile=None, maxEntries=10):
+        # highscoreFile - path to the highscore text file
+        # leaderboardFile - path to the leaderboard json file, or None for no leaderboard
+        # maxEntries - number of scores kept on the leaderboard
+        self.highscoreFile = highscoreFile
+        self.leaderboardFile = leaderboardFile
+        self.maxEntries = maxEntries
+        # one thread, so writes happen in the order they were asked for
+        self.writer = ThreadPoolExecutor(max_workers=1)
+        self.pendingWrites = []
+        self.load()
+
+    # read both files - a missing or broken file just counts as no scores
+    def load(self):
+        self.highscore = 0
+        try:
+            with open(self.highscoreFile) as f:
+                self.highscore = int(f.readline())
+        except (OSError, ValueError) as e:
+            print('Unable to load highscore:', self.highscoreFile, e)
+
+        # list of {"score": score, "wave": wave reached}, best first
+        self.leaderboard = []
+        if self.leaderboardFile is not None and os.path.exists(self.leaderboardFile):
+            try:
+                with open(self.leaderboardFile) as f:
+                    entries = json.load(f)
+                self.leaderboard = sorted(
+                    ({"score": int(entry["score"]), "wave": int(entry["wave"])} for entry in entries),
+                    key=lambda entry: entry["score"], reverse=True)[:self.maxEntries]
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print('Unable to load leaderboard:', self.leaderboardFile, e)
+
+        # a highscore from before the leaderboard existed still counts
+        if self.leaderboard:
+            self.highscore = max(self.highscore, self.leaderboard[0]["score"])
+
+    # add a finished game's score
+    # returns True if it is a new highscore
+    def addScore(self, score, wave):
+        newHighscore = score > self.highscore
+        if newHighscore:
+            self.highscore = score
+            self.saveInBackground(self.highscoreFile, str(score))
+
+        if self.leaderboardFile is not None:
+            if len(self.leaderboard) < self.maxEntries or score > self.leaderboard[-1]["score"]:
+                self.leaderboard.append({"score": score, "wave": wave})
+                # sort is stable, so older entries stay above new ones with the same score
+                self.leaderboard.sort(key=lambda entry: entry["score"], reverse=True)
+                del self.leaderboard[self.maxEntries:]
+                self.saveInBackground(self.leaderboardFile,
+                                      json.dumps(self.leaderboard, indent=4))
+        return newHighscore
+
+    # write text to a file on the writer thread
+    # the text is made here, so later changes to the scores don't affect this write
+    def saveInBackground(self, filename, text):
+        self.pendingWrites = [write for write in self.pendingWrites if not write.done()]
+        self.pendingWrites.append(self.writer.submit(self.writeFile, filename, text))
+
+    # wait for all the writes so far to finish
+    def flush(self):
+        for write in self.pendingWrites:
+            write.result()
+        self.pendingWrites = []
+
+    # write to a temporary file, then rename it over the real one
+    @staticmethod
+    def writeFile(filename, text):
+        tempFile = filename + '.tmp'
+        try:
+            with open(tempFile, 'w') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tempFile, filename)
+        except OSError as e:
+            print('Unable to save scores:', filename, e)
@@ -0,0 +1,30 @@
+# This class is the game's clock
+# The game is simulated in fixed ticks (120 a second) and everything that
+# times something (cooldowns, wave pauses, the death screen delay) reads the
+# time from here instead of pygame.time.get_ticks().
+# The time only moves on when advance() is called at the end of each tick, so
+# the game plays the same whether the ticks are run in real time by the game
+# loop or as fast as possible with no display (headless.py).
+# Anything with a ticks() method that returns milliseconds can be used instead.
+
+
+class SimClock(object):
+    def __init__(self, tickRate=120):
+        # tickRate - ticks per simulated second
+        self.tickRate = tickRate
+        # length of a tick in milliseconds
+        self.stepMs = 1000 / tickRate
+        # number of ticks run so far
+        self.tickCount = 0
+
+    # simulated time in milliseconds, like pygame.time.get_ticks()
+    def ticks(self):
+        return int(self.tickCount * self.stepMs)
+
+    # simulated time in seconds
+    def seconds(self):
+        return self.tickCount / self.tickRate
+
+    # move on to the next tick
+    def advance(self):
+        self.tickCount += 1
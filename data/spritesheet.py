@@ -4,36 +4,35 @@
 # I've added some code to fail if the file wasn't found..
 # Note: When calling images_at the rect is the format:
 # (x, y, x + offset, y + offset)
+# Sheets and frames come from the shared asset cache in assets.py, so making
+# a Spritesheet for an image that has already been loaded is free.
+# (or from the sprite atlas, if it has been built)
 
 # https://www.pygame.org/wiki/Spritesheet
 
-import pygame
+from data import assets
 
 
 class Spritesheet(object):
     def __init__(self, filename):
-        try:
-            self.sheet = pygame.image.load(filename).convert_alpha()
-        except pygame.error:
-            print('Unable to load spritesheet image:', filename)
-            raise SystemExit
+        self.filename = filename
+
+    # the whole sheet - only loaded if something asks for it, as the frames
+    # can come from the sprite atlas without loading the sheet
+    # exits if the image can't be loaded
+    @property
+    def sheet(self):
+        return assets.loadImage(self.filename)
     # Load a specific image from a specific rectangle
 
     def image_at(self, rectangle, colorkey=None):
         "Loads image from x,y,x+offset,y+offset"
-        rect = pygame.Rect(rectangle)
-        image = pygame.Surface(rect.size).convert_alpha()
-        image.blit(self.sheet, (0, 0), rect)
-        if colorkey is not None:
-            if colorkey is -1:
-                colorkey = image.get_at((0, 0))
-            image.set_colorkey(colorkey, pygame.BLEND_RGBA_ADD)
-        return image
+        return assets.loadFrames(self.filename, [rectangle], colorkey)[0]
     # Load a whole bunch of images and return them as a list
 
     def images_at(self, rects, colorkey=None):
         "Loads multiple images, supply a list of coordinates"
-        return [self.image_at(rect, colorkey) for rect in rects]
+        return list(assets.loadFrames(self.filename, rects, colorkey))
     # Load a whole strip of images
 
     def load_strip(self, rect, image_count, colorkey=None):
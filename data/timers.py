@@ -0,0 +1,89 @@
+# This class runs things at a set time on the simulation clock
+# Rather than every cooldown being checked every tick (now - lastFire >= cooldown)
+# on every entity, anything that has to happen later asks for a callback at a
+# time, and update() (run once a tick) only looks at the timers that are due.
+# They're kept in a heap ordered by when they're due, so a tick where nothing is
+# due costs one comparison however many timers are waiting.
+# Timers due on the same tick run in the order they're due, then the order they
+# were made, so the game still plays the same every time.
+# The clock is anything with a ticks() method that returns milliseconds (SimClock).
+
+import heapq
+from itertools import count
+
+
+class Timers(object):
+    def __init__(self, clock):
+        self.clock = clock
+        # [due, order made, callback, args] - callback is None once it's run or been cancelled
+        self.heap = []
+        self.order = count()
+
+    # call callback(*args) once the clock reaches time (in milliseconds)
+    # returns the timer, which can be given to cancel()
+    def at(self, time, callback, *args):
+        timer = [time, next(self.order), callback, args]
+        heapq.heappush(self.heap, timer)
+        return timer
+
+    # call callback(*args) delay milliseconds from now
+    def after(self, delay, callback, *args):
+        return self.at(self.clock.ticks() + delay, callback, *args)
+
+    # stop a timer from running - does nothing if it is None or has already run
+    # (it's left in the heap and skipped when it's due, so this is O(1))
+    def cancel(self, timer):
+        if timer is not None:
+            timer[2] = None
+
+    # run every timer that is due, in order - call once a tick
+    def update(self):
+        heap = self.heap
+        now = self.clock.ticks()
+        while heap and heap[0][0] <= now:
+            timer = heapq.heappop(heap)
+            callback = timer[2]
+            if callback is not None:
+                timer[2] = None
+                callback(*timer[3])
+
+    # a cooldown that runs on these timers
+    def cooldown(self, length, ready=False):
+        return Cooldown(self, length, ready)
+
+    # number of timers waiting (including cancelled ones that haven't been skipped yet)
+    def __len__(self):
+        return len(self.heap)
+
+
+# something that can only be done once every so often, e.g. shooting
+# ready is True once length milliseconds have passed since it was last used -
+# it is set by a timer, so checking it is just reading an attribute
+class Cooldown(object):
+    __slots__ = ('timers', 'length', 'ready', 'timer')
+
+    def __init__(self, timers, length, ready=False):
+        self.timers = timers
+        self.length = length
+        self.ready = ready
+        self.timer = None
+        # if not ready, it's ready length milliseconds from now
+        if not ready:
+            self.start()
+
+    # start the cooldown again from now
+    def start(self):
+        self.timers.cancel(self.timer)
+        self.ready = False
+        self.timer = self.timers.after(self.length, self.finish)
+
+    def finish(self):
+        self.ready = True
+        self.timer = None
+
+    # if ready, start the cooldown and return True
+    def use(self):
+        if self.ready:
+            self.start()
+            return True
+        return False
@@ -0,0 +1,122 @@
+# This handles the wave data
+# WaveData.json is loaded once and compiled into a table of Wave tuples so the
+# game can look up the current wave by index instead of re-reading the file
+# every frame.
+# Each wave stores the functions that make its enemies (looked up by name in the
+# enemy registry when the file loads, so a typo is caught straight away) and the
+# cumulative weights, which is what random.choices wants as cum_weights.
+
+import json
+import math
+import os
+import time
+from collections import namedtuple
+from itertools import accumulate
+
+# one compiled wave
+# name - the wave name shown on the hud
+# toKill - how many enemies need to be killed to finish the wave
+# enemyTypes - tuple of functions that make the enemies that can spawn this wave
+# cumWeights - tuple of cumulative spawn weights, same order as enemyTypes
+Wave = namedtuple('Wave', ['name', 'toKill', 'enemyTypes', 'cumWeights'])
+
+
+# True for ints and finite floats, but not bools (json true/false)
+def isNumber(value):
+    return (isinstance(value, (int, float)) and not isinstance(value, bool) and
+            math.isfinite(value))
+
+
+class WaveTable(object):
+    def __init__(self, filename, enemyRegistry, watch=False):
+        # filename - path to the json file
+        # enemyRegistry - dictionary of enemy name -> function that makes that enemy at (x, y)
+        # watch - if True, reloadIfChanged() re-parses the file when its mtime changes
+        self.filename = filename
+        self.enemyRegistry = enemyRegistry
+        self.watch = watch
+        self.checkInterval = 0.5
+        self.lastCheck = time.monotonic()
+        self.mtime = None
+        self.waves = ()
+        self.load()
+
+    # read and compile the json file - quits if the file can't be used
+    def load(self):
+        try:
+            self.compile()
+        except (OSError, ValueError, KeyError) as e:
+            print('Unable to load wave data:', self.filename, e)
+            raise SystemExit
+
+    # compile the json file into the wave table
+    # raises instead of quitting so a bad edit during hot-reload can be ignored
+    def compile(self):
+        mtime = os.stat(self.filename).st_mtime
+        with open(self.filename) as f:
+            data = json.load(f)["WaveData"]
+
+        waves = []
+        for waveData in data:
+            for name in waveData["EnemyTypes"]:
+                if name not in self.enemyRegistry:
+                    raise ValueError('unknown enemy type ' + repr(name))
+            enemyTypes = tuple(self.enemyRegistry[name]
+                               for name in waveData["EnemyTypes"])
+            weights = waveData["EnemyTypesWeights"]
+            if len(weights) != len(enemyTypes):
+                raise ValueError('enemy types and weights do not match in ' +
+                                 repr(waveData["WaveName"]))
+            # caught here, otherwise random.choices fails when the wave spawns an enemy
+            if len(weights) == 0:
+                raise ValueError('no enemy types in ' + repr(waveData["WaveName"]))
+            for weight in weights:
+                if not isNumber(weight) or weight <= 0:
+                    raise ValueError('enemy weights must be numbers above 0 in ' +
+                                     repr(waveData["WaveName"]))
+            # the wave bar divides by it
+            toKill = waveData["EnemiesToKill"]
+            if not isinstance(toKill, int) or isinstance(toKill, bool) or toKill <= 0:
+                raise ValueError('EnemiesToKill must be a whole number above 0 in ' +
+                                 repr(waveData["WaveName"]))
+            waves.append(Wave(waveData["WaveName"], toKill,
+                              enemyTypes, tuple(accumulate(weights))))
+        if len(waves) == 0:
+            raise ValueError('no waves')
+
+        # only swap the table in once everything has compiled
+        self.waves = tuple(waves)
+        self.mtime = mtime
+
+    # re-parse the file only if it has been modified since the last load
+    # the mtime is checked at most once every checkInterval seconds
+    # returns True if the table was reloaded
+    def reloadIfChanged(self):
+        if not self.watch:
+            return False
+        now = time.monotonic()
+        if now - self.lastCheck < self.checkInterval:
+            return False
+        self.lastCheck = now
+        try:
+            mtime = os.stat(self.filename).st_mtime
+        except OSError:
+            return False
+        if mtime == self.mtime:
+            return False
+        try:
+            self.compile()
+        except (OSError, ValueError, KeyError) as e:
+            # keep the old table, and don't retry until the file changes again
+            print('Unable to reload wave data:', self.filename, e)
+            self.mtime = mtime
+            return False
+        return True
+
+    # get the wave for a wave number (starting at 1)
+    # wave numbers past the end of the file use the final wave (endless mode)
+    def wave(self, waveNumber):
+        return self.waves[min(waveNumber, len(self.waves)) - 1]
+
+    def __len__(self):
+        return len(self.waves)
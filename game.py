@@ -1,22 +1,80 @@
 # imports
+import time
+from concurrent.futures import ThreadPoolExecutor
 import pygame
 import math
 import random
 from data import spritesheet as sp
-import json
+from data import assets
+from data import waves as wv
+from data import render
+from data import collision
+from data.entities import EntityList
+from data import movement
+from data import pools
+from data import scores
+from data import hud
+from data import profiler as prof
+from data import replays
+from data import inputs
+from data.effects import EffectPool
+from data.simclock import SimClock
+from data.timers import Timers
+
+# when this file started running (for the startup timings)
+moduleStart = time.perf_counter()
+
+# importing this file doesn't open a window or load anything - bootstrap() does that,
+# so tools can change the settings below first (resetGame() also picks up changes to
+# the movement and collision settings)
 
-# initialise pygame
-pygame.init()
-# set the caption of the window
-pygame.display.set_caption('Invasion of the Tacos')
 # variables for the width and height of the game window
 displayWidth = 1920
 displayHeight = 1080
-# set the game display
-gameDisplay = pygame.display.set_mode(
-    (displayWidth, displayHeight), pygame.FULLSCREEN)
-# game clock
-clock = pygame.time.Clock()
+# the game display - made by bootstrap()
+gameDisplay = None
+# game clock - keeps the frame rate
+clock = None
+
+# keyboard and mouse - the events are read into a new snapshot once a frame (see data/inputs.py)
+inputState = None
+currentInput = inputs.InputState().snapshot
+
+# how long each part of starting up took in seconds, in order - filled in by bootstrap() and the first frame
+startupTimes = {}
+lastStartupStep = None
+# if True, the startup timings are printed once the first frame has been drawn
+reportStartup = False
+# if True, every image and font is loaded behind a loading screen before the menu,
+# rather than when it's first drawn (which can stall that frame)
+usePreloader = True
+
+# simulation clock - the game runs in fixed ticks and all timing is done with this
+tickRate = 120
+simClock = SimClock(tickRate)
+# cooldowns and delays - run once a tick, see data/timers.py
+timers = Timers(simClock)
+# if the game falls behind, at most this many ticks are run before drawing a frame
+maxTicksPerFrame = 5
+
+# if True, only the parts of the screen that changed are redrawn each frame
+useDirtyRects = False
+
+# if True, while playing, the next frame's ticks are simulated on a worker thread while
+# this frame is drawn from a draw list (see buildDrawList) - pygame lets other threads
+# run during blits, so this helps on multi-core machines. What's on screen is a frame behind
+usePipelining = False
+
+# how collisions are found - "grid" (spatial hash) or "batch" (pygame's collidelistall)
+collisionMode = "grid"
+
+# if True, enemies and bullets are all moved at once with NumPy (if it is installed)
+# off by default - with the few enemies of a normal game the NumPy overhead makes
+# it slower than moving them one at a time, it only wins with hundreds on screen
+useVectorMovement = False
+# holds the positions of everything that moves - None when moving one object at a time
+# made from the settings above by bootstrap() and resetGame()
+movementSystem = None
 
 # RGB colour codes
 black = (0, 0, 0)
@@ -33,28 +91,54 @@ gamePaused = False
 # for menu
 canPlayGame = False
 
-# getting last time for variables that rely on time
-lastFire = pygame.time.get_ticks()
-lastSpawn = pygame.time.get_ticks()
-lastHit = pygame.time.get_ticks()
+# shooting cooldown - the time between each player bullet
+shootCooldown = 500  # 0.5 second cooldown
+fireTimer = timers.cooldown(shootCooldown)
 
 # spawn cooldown - the time between each enemy spawn
 spawnCooldown = 1500
+spawnTimer = timers.cooldown(spawnCooldown)
 
-# ui
-# loads the heart icon spritesheet
-heartSS = sp.Spritesheet('data\Sprites\AppleHeartSS.png')
-heartImgs = []
+# if True, WaveData.json is re-read whenever it is saved (for balancing waves while playing)
+watchWaveData = False
+
+# if False, highscores aren't written to highscore.txt (for simulations)
+saveHighscores = True
+
+# profiler - F3 shows the overlay with fps, time per phase and entity counts
+# set profileTraceFile to a .csv or .json filename to record every frame to it
+profiler = prof.Profiler()
+profileTraceFile = None
+# frames between updates of the overlay's numbers (so they can be read)
+profilerOverlayRefresh = 30
+# if True, blits of images not in the display's pixel format are counted and shown on the overlay
+assets.checkFormats = False
+
+# set to a filename to record a replay of the session (play it back with headless.py --replay)
+recordReplayFile = None
+replayRecorder = None
+
+# highscore and leaderboard - read once by bootstrap(), and saved in the background when the player dies
+scoreStore = None
+
+# ui - the images are only loaded the first time they're drawn
+# the heart icon spritesheet
+heartSS = sp.Spritesheet('data\\Sprites\\AppleHeartSS.png')
 # each image 48x56
-rectsAt = [(0, 0, 48, 56), (48, 0, 48, 56)]
-heartImgs = heartSS.images_at(rectsAt, black)
+heartRects = [(0, 0, 48, 56), (48, 0, 48, 56)]
 
-# loads the main menu image
-menuImg = pygame.image.load('data\MenuImages\MenuScreen.png')
+# the main menu image
+menuImageFile = 'data\\MenuImages\\MenuScreen.png'
 
 
 # player class
 class Player:
+    # sprites - 60x70 each
+    sheetFile = 'data\\Sprites\\AppleCharacterSS.png'
+    sheetRects = [(0, 0, 60, 70), (60, 0, 60, 70),
+                  (0, 70, 60, 70), (60, 70, 60, 70)]
+    deathImageFile = 'data\\Sprites\\DeadApple.png'
+
     # crucial to classes - always executed when the player is initiated, used to assign values and other operations that are necessary when the object is created
     def __init__(self, x, y):
         # player coordinates
@@ -66,13 +150,12 @@ class Player:
         self.height = 70
 
         # load player sprites
-        self.playerSS = sp.Spritesheet('data\Sprites\AppleCharacterSS.png')
+        self.playerSS = sp.Spritesheet(self.sheetFile)
         self.playerImgs = []
-        self.rectsAt = [(0, 0, 60, 70), (60, 0, 60, 70),
-                        (0, 70, 60, 70), (60, 70, 60, 70)]
+        self.rectsAt = self.sheetRects
         self.playerImgs = self.playerSS.images_at(self.rectsAt, black)
 
-        self.playerDeathImg = pygame.image.load('data\Sprites\DeadApple.png')
+        self.playerDeathImg = assets.loadImage(self.deathImageFile)
 
         self.currentImg = self.playerImgs[0]
 
@@ -89,6 +172,8 @@ class Player:
         self.rightPressed = False
         self.upPressed = False
         self.downPressed = False
+        # shooting bool
+        self.shootPressed = False
 
         # facing direction
         self.facingDirection = "right"
@@ -107,17 +192,26 @@ class Player:
         self.currentHealth = self.maxHealth
         self.isDead = False
         self.hitCooldown = 750
+        # ready when the player can be hit again (invulnerability cooldown)
+        self.hitTimer = timers.cooldown(self.hitCooldown)
         self.playerDead = False
 
         # death screen ui
         self.canDrawDeathScreen = False  # for timing the ui on death
-        self.timedDeath = False  # this is so diedAt doesn't get set all the time
+        self.timedDeath = False  # this is so the death screen timer is only started once
+        self.deathScreenCooldown = 1250  # wait 1.25 seconds before drawing it
+        self.scoreSaved = False  # so the score is only added to the highscores once
 
         # flash when hit variables
-        self.lastFlash = pygame.time.get_ticks()
         self.shouldFlash = False
         self.canFlash = False
         self.flashCooldown = 75
+        # timers for the next flash and the end of flashing
+        self.flashTimer = None
+        self.flashEndTimer = None
+        # alpha the sprite is drawn with - only set on the Surface when it's drawn,
+        # so the simulation never changes a Surface that might be being blitted
+        self.alpha = 255
 
         # score
         self.score = 0
@@ -127,28 +221,28 @@ class Player:
         self.enemiesKilled = 0  # keep track of how many enemies have been killed
         self.waveNumber = 1  # keep track of what wave you are on
         self.waveCompleted = False  # check if the current wave has been completed
-        # this is so you wait a few seconds until the next wave
-        self.timeWaveDone = pygame.time.get_ticks()
-
-        # get wave data from json file -- initial
-        self.waveData = open('data\WaveData.json')
-        self.contents = self.waveData.read()  # reads entire file into a single string
-        # turns contents into a dictionary
-        self.data = json.loads(self.contents)
-        self.data = self.data["WaveData"]  # get list of dictionary
+        # this is so you wait a second until the next wave
+        self.pauseTime = 1000
+        self.waveTimer = None
+        self.pauseOver = False  # set by waveTimer
+
+        # get wave data from the wave table -- initial
+        self.getWave()
+
+    # look up the current wave in the wave table
+    def getWave(self):
+        wave = waveTable.wave(self.waveNumber)
         # get wave name
-        self.waveName = self.data[self.waveNumber - 1]["WaveName"]
+        self.waveName = wave.name
         # get amount to kill
-        self.toKill = self.data[self.waveNumber - 1]["EnemiesToKill"]
+        self.toKill = wave.toKill
         # get which enemy types can spawn during this wave
-        self.enemyTypesForWave = self.data[self.waveNumber - 1]["EnemyTypes"]
-        # get the weights for each enemy type that can spawn during this wave
-        self.enemyWeightsForWave = self.data[self.waveNumber -
-                                             1]["EnemyTypesWeights"]
-        self.waveData.close()
+        self.enemyTypesForWave = wave.enemyTypes
+        # get the cumulative weights for each enemy type that can spawn during this wave
+        self.enemyCumWeightsForWave = wave.cumWeights
 
-    # draw the player's sprite to the screen - this is called once per frame
-    def drawPlayer(self):
+    # the player's sprite for this frame - (Surface, (x, y), alpha), see drawSprite()
+    def sprite(self):
         # if not dead, draw character sprites
         if not self.playerDead:
             if self.facingDirection == "right" or self.facingDirection == "right up" or self.facingDirection == "right down":
@@ -163,8 +257,12 @@ class Player:
         else:
             self.currentImg = self.playerDeathImg
 
-        # blit draws the image to the screen at the player's coordinates
-        gameDisplay.blit(self.currentImg, (self.x, self.y))
+        return self.currentImg, (self.x, self.y), self.alpha
+
+    # draw the player's sprite to the screen - this is called once per frame
+    # returns the rect it drew on (for the renderer)
+    def drawPlayer(self):
+        return drawSprite(self.sprite())
 
     # update calls every frame
     def update(self):
@@ -230,60 +328,73 @@ class Player:
 
         # flash anim
         if self.shouldFlash and self.canFlash:
-            self.currentImg.set_alpha(64)
+            self.alpha = 64
         else:
-            self.currentImg.set_alpha(255)
+            self.alpha = 255
 
         # if health is 0 or below (dead)
         if self.currentHealth <= 0:
             # pause the game
             self.playerDead = True
+            # wait more than 1.25 seconds before drawing the death screen
             if not self.timedDeath:
-                self.diedAt = pygame.time.get_ticks()
+                timers.after(self.deathScreenCooldown + 1, self.showDeathScreen)
                 self.timedDeath = True
+                # the gravestone doesn't flash - stop the flash from the hit that killed the player
+                self.stopFlashing()
+                self.alpha = 255
 
         # waves - same thing as in init, but this time updates it every wave
-        # open the json file
-        self.waveData = open('data\WaveData.json')
-        self.contents = self.waveData.read()  # reads entire file into a single string
-        # turns contents into a dictionary
-        self.data = json.loads(self.contents)
-        self.data = self.data["WaveData"]  # get list of dictionary
-        # get wave name
-        self.waveName = self.data[player.waveNumber - 1]["WaveName"]
-        # get amount to kill
-        self.toKill = self.data[player.waveNumber - 1]["EnemiesToKill"]
-        # get which enemy types can spawn during this wave
-        self.enemyTypesForWave = self.data[player.waveNumber - 1]["EnemyTypes"]
-        # get the weights for each enemy type that can spawn during this wave
-        self.enemyWeightsForWave = self.data[player.waveNumber -
-                                             1]["EnemyTypesWeights"]
-        self.waveData.close()
+        # only re-reads the json file if watching it and it has been saved
+        waveTable.reloadIfChanged()
+        self.getWave()
 
         # if not on final wave
-        if not self.waveNumber == len(self.data):
+        if not self.waveNumber == len(waveTable):
             # if killed enough enemies
-            if self.enemiesKilled >= self.toKill:
-                # set the time when finished wave
-                if not self.waveCompleted:
-                    self.timeWaveDone = pygame.time.get_ticks()
-                    self.waveCompleted = True
-                # pause for a bit
-                self.pauseTime = 1000
-                # get the current time
-                self.nowTime = pygame.time.get_ticks()
-                if self.nowTime - self.timeWaveDone > self.pauseTime:
-                    # reset stuff and increment wave counter
-                    self.waveNumber += 1
-                    self.enemiesSpawned = 0  # reset enemies spawned so more can spawn
-                    self.enemiesKilled = 0
-                    self.waveCompleted = False
+            if self.enemiesKilled >= self.toKill and not self.waveCompleted:
+                # pause for a bit (more than pauseTime) before the next wave
+                self.waveCompleted = True
+                self.waveTimer = timers.after(self.pauseTime + 1, self.endWavePause)
+            # the next wave starts at the end of the tick, after this tick's spawning
+            if self.pauseOver:
+                # reset stuff and increment wave counter
+                self.waveNumber += 1
+                self.enemiesSpawned = 0  # reset enemies spawned so more can spawn
+                self.enemiesKilled = 0
+                self.waveCompleted = False
+                self.pauseOver = False
+
+    # run by a timer once the pause after a wave is over
+    def endWavePause(self):
+        self.waveTimer = None
+        self.pauseOver = True
+
+    # run by a timer once the player has been dead for long enough
+    def showDeathScreen(self):
+        self.canDrawDeathScreen = True
 
     # call to take damage
     def takeDamage(self, healthToTake):
         self.currentHealth -= healthToTake
-        # make player flash
+        # make player flash every flashCooldown until just before they can be hit again
         self.canFlash = True
+        self.shouldFlash = True
+        timers.cancel(self.flashTimer)
+        timers.cancel(self.flashEndTimer)
+        self.flashTimer = timers.after(self.flashCooldown, self.flash)
+        self.flashEndTimer = timers.after(self.hitCooldown - 150, self.stopFlashing)
+
+    # flash on or off - run by a timer
+    def flash(self):
+        self.shouldFlash = not self.shouldFlash
+        self.flashTimer = timers.after(self.flashCooldown, self.flash)
+
+    def stopFlashing(self):
+        timers.cancel(self.flashTimer)
+        self.flashTimer = None
+        self.flashEndTimer = None
+        self.canFlash = False
 
     # respawn
     def respawn(self):
@@ -296,6 +407,11 @@ class Player:
         self.facingDirection = "right"
         self.canDrawDeathScreen = False
         self.timedDeath = False
+        self.scoreSaved = False
+        timers.cancel(self.waveTimer)
+        self.waveTimer = None
+        self.waveCompleted = False
+        self.pauseOver = False
         self.waveNumber = 1
         self.enemiesKilled = 0
         self.enemiesSpawned = 0
@@ -303,6 +419,13 @@ class Player:
 
 # bullet class
 class Bullet:
+    # only these attributes are stored on each bullet (no __dict__), so there can be lots of them
+    __slots__ = ('x', 'y', 'rect', 'facing', 'speed', 'moveSlot')
+
+    # shared by every bullet - loaded when the first bullet is made
+    imageFile = 'data\\Sprites\\Bullet.png'
+    bulletImg = None
+
     def __init__(self, x, y, facing):
         # bullet coordinates
         self.x = int(x)
@@ -311,8 +434,8 @@ class Bullet:
         # self.bulletVelocity = pygame.math.Vector2(0, 0)
 
         # load player sprite
-        self.bulletImg = pygame.image.load(
-            'data\Sprites\Bullet.png').convert_alpha()
+        if Bullet.bulletImg is None:
+            Bullet.bulletImg = assets.loadImage(Bullet.imageFile)
 
         # collision rect
         self.rect = pygame.Rect(self.x, self.y, 12, 12)
@@ -329,101 +452,133 @@ class Bullet:
         elif facing == "right" or facing == "down" or facing == "right up" or facing == "right down":
             self.speed = self.speed
 
+        # start moving with the movement system - bullets only ever move along one axis
+        self.moveSlot = None
+        if movementSystem is not None:
+            if "left" in facing or "right" in facing:
+                movementSystem.add(self, movement.FIXED, vx=self.speed)
+            else:
+                movementSystem.add(self, movement.FIXED, vy=self.speed)
+
+    # the bullet's sprite for this frame - (Surface, (x, y), alpha), see drawSprite()
+    def sprite(self):
+        return self.bulletImg, (self.x, self.y), None
+
     def drawBullet(self):
-        gameDisplay.blit(self.bulletImg, (self.x, self.y))
+        return assets.blit(gameDisplay, self.bulletImg, (self.x, self.y))
 
 
 # region Enemy Stuff
 # enemy parent class
+# everything that is the same for every enemy of a type (size, sprites, speed,
+# damage, score) is a class attribute of that type, set in the subclasses
+# each enemy only stores what changes during its life - the attributes in __slots__
 class Enemy:
-    def __init__(self, x, y, w, h, movementSS, deathSS, speed, damage, health, scoreToGive):
+    __slots__ = ('x', 'y', 'rect', 'currentImg', 'facingDirection', 'health', 'moveSlot')
+
+    # how the movement system moves this type of enemy
+    moveKind = movement.FOLLOW
+    stopRange = -1
+
+    # pixel dimensions
+    width = 0
+    height = 0
+    # offsets for death animation - make it centred
+    offsetX = 0
+    offsetY = 0
+    # sprite sheets for moving and for death
+    movementSheet = None
+    deathSheet = None
+    # enemy movement speed, damage, health and score to give
+    speed = 0
+    damage = 0
+    maxHealth = 0
+    scoreToGive = 0
+
+    # sprites - loaded by loadSprites() when the first enemy of the type is made
+    enemyImgs = None
+    deathImages = None
+
+    # where each frame is on the death sprite sheets (the same for every enemy)
+    deathRects = [(0, 0, 120, 120), (120, 0, 120, 120), (240, 0, 120, 120), (0, 120, 120, 120), (
+        120, 120, 120, 120), (240, 120, 120, 120), (0, 240, 120, 120), (120, 240, 120, 120), (240, 240, 120, 120)]
+
+    def __init__(self, x, y):
         # enemy class
+        # load this type's sprites if this is the first one
+        if type(self).enemyImgs is None:
+            type(self).loadSprites()
+
+        self.moveSlot = None
+        self.reset(x, y)
+
+    # load the sprites for an enemy type - these come from the asset cache and
+    # are stored on the class, so every enemy of the type shares the frames
+    @classmethod
+    def loadSprites(cls):
+        cls.enemyImgs = assets.loadFrames(cls.movementSheet, cls.movementRects(), black)
+        # colour key (0,0,0) = black, removes black pixels
+        cls.deathImages = assets.loadFrames(cls.deathSheet, cls.deathRects, black)
+
+    # where the movement frames are on the sheet - right, left, then damaged right and left
+    @classmethod
+    def movementRects(cls):
+        w = cls.width
+        h = cls.height
+        return [(0, 0, w, h), (w, 0, w, h), (0, h, w, h), (w, h, w, h)]
+
+    # put the enemy at (x, y) as a new enemy - used when first made and when
+    # reused from its pool after dying
+    def reset(self, x, y):
         self.x = int(x)
         self.y = int(y)
 
-        # pixel dimensions
-        self.width = w
-        self.height = h
-
-        # score to give
-        self.scoreToGive = scoreToGive
-
-        # offsets for death animation - make it centred
-        self.offsetX = (120 - self.width) / 2
-        self.offsetY = (120 - self.height) / 2
-
         # collision rect
         self.rect = pygame.Rect(self.x, self.y, self.width, self.height)
 
-        # load enemy sprites
-        self.enemySS = sp.Spritesheet(movementSS)
-        self.enemyImgs = []
-        self.rectsAt = [(0, 0, w, h), (w, 0, w, h), (0, h, w, h), (w, h, w, h)]
-        self.enemyImgs = self.enemySS.images_at(self.rectsAt, black)
-
-        # sprite sheet for death
-        self.deathSpritesheet = sp.Spritesheet(deathSS)
-        self.deathImages = []
-        self.rectsAt = [(0, 0, 120, 120), (120, 0, 120, 120), (240, 0, 120, 120), (0, 120, 120, 120), (
-            120, 120, 120, 120), (240, 120, 120, 120), (0, 240, 120, 120), (120, 240, 120, 120), (240, 240, 120, 120)]
-        # colour key (0,0,0) = black, removes black pixels
-        self.deathImages = self.deathSpritesheet.images_at(
-            self.rectsAt, black)
-
         self.currentImg = self.enemyImgs[0]
 
         # facing direction
         self.facingDirection = "right"
 
         # health stuff
-        self.maxHealth = health
         self.health = self.maxHealth
-        self.animCount = 0
-        self.deathAnimFinished = False
 
-        # enemy movement speed
-        self.speed = speed
+        # start moving with the movement system
+        if movementSystem is not None:
+            movementSystem.add(self, self.moveKind, speed=self.speed,
+                               stopRange=self.stopRange)
 
-        # damage
-        self.damage = damage
-
-    # draw the enemy's sprite to the screen - move this to parent class
-    def drawEnemy(self):
+    # the enemy's sprite for this frame - (Surface, (x, y), alpha), or None if there isn't one
+    def sprite(self):
         # if at full health
         if not self.health <= 0 and self.health == self.maxHealth:
             # to show enemy hitbox = pygame.draw.rect(gameDisplay, white, self.rect)
             # change sprite depending on facing direction
             if self.facingDirection == "right":
-                gameDisplay.blit(self.enemyImgs[0], (self.x, self.y))
                 self.currentImg = self.enemyImgs[0]
             elif self.facingDirection == "left":
-                gameDisplay.blit(self.enemyImgs[1], (self.x, self.y))
                 self.currentImg = self.enemyImgs[1]
+            else:
+                return None
         # if lost a health - change to damaged state (only works on enemies with 2 health)
         elif not self.health <= 0 and self.health == self.maxHealth - 1:
             # change sprite depending on facing direction
             if self.facingDirection == "right":
-                gameDisplay.blit(self.enemyImgs[2], (self.x, self.y))
                 self.currentImg = self.enemyImgs[2]
             elif self.facingDirection == "left":
-                gameDisplay.blit(self.enemyImgs[3], (self.x, self.y))
                 self.currentImg = self.enemyImgs[3]
-        # if dead
-        elif self.health <= 0 and not self.deathAnimFinished:
-            # death animation
-            # we have 9 images for our death animation, and we show the same image for 3 frames
-            # by using the number 27 as an upper bound for self.animCount because 27 / 3 = 9
-            # 9 images shown 3 times each animation
-            # whole divide animCount by 3 so each sprite is shown for 3 frames
-            # subtracting the offset then centres it
-            gameDisplay.blit(
-                self.deathImages[self.animCount//3], (self.x - self.offsetX, self.y - self.offsetY))
-            self.currentImg = self.deathImages[self.animCount//3]  # 3
-            self.animCount += 1
-
-            # if anim finishes, destory it
-            if self.animCount + 1 >= 27:  # 27
-                self.deathAnimFinished = True
+            else:
+                return None
+        # if dead - the death animation is drawn by the effects
+        else:
+            return None
+        return self.currentImg, (self.x, self.y), None
+
+    # draw the enemy's sprite to the screen - move this to parent class
+    # returns the rect drawn on, or None if nothing was drawn
+    def drawEnemy(self):
+        return drawSprite(self.sprite())
 
     # follow player
     def followPlayer(self, player):
@@ -457,16 +612,32 @@ class Enemy:
             # increment score and enemiesKilled by 1 for every enemy killed
             player.score += self.scoreToGive
             player.enemiesKilled += 1
-            if self.deathAnimFinished:
-                # destroy enemy object by removing it from enemies list
-                enemiesList.pop(enemiesList.index(self))
+            self.die(enemiesList)
+
+    # play the death animation and destroy the enemy object straight away
+    def die(self, enemiesList):
+        # the effects play the death strip - 9 images, each shown for 3 ticks
+        # subtracting the offset centres it
+        effects.spawn(self.deathImages, self.x - self.offsetX, self.y - self.offsetY)
+        # dead enemies stop moving
+        stopMoving(self)
+        enemiesList.remove(self)
 
 
 # taco enemy class
 class TacoEnemy(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, 90, 50, 'data\Sprites\TacoEnemySS.png',
-                         'data\Sprites\TacoDeathSS.png', 1.5, 1, 1, 1)
+    __slots__ = ()
+
+    width = 90
+    height = 50
+    offsetX = (120 - width) / 2
+    offsetY = (120 - height) / 2
+    movementSheet = 'data\\Sprites\\TacoEnemySS.png'
+    deathSheet = 'data\\Sprites\\TacoDeathSS.png'
+    speed = 1.5
+    damage = 1
+    maxHealth = 1
+    scoreToGive = 1
 
     def drawEnemy(self):
         return super().drawEnemy()
@@ -480,11 +651,19 @@ class TacoEnemy(Enemy):
 
 # burger enemy class
 class BurgerEnemy(Enemy):
-    def __init__(self, x, y):
-        super().__init__(x, y, 70, 65, 'data\Sprites\BurgerEnemySS.png',
-                         'data\Sprites\BurgerDeathSS.png', 1.5, 2, 2, 2)
-        # override
-        self.offsetY = 30
+    __slots__ = ()
+
+    width = 70
+    height = 65
+    offsetX = (120 - width) / 2
+    # override
+    offsetY = 30
+    movementSheet = 'data\\Sprites\\BurgerEnemySS.png'
+    deathSheet = 'data\\Sprites\\BurgerDeathSS.png'
+    speed = 1.5
+    damage = 2
+    maxHealth = 2
+    scoreToGive = 2
 
     def drawEnemy(self):
         return super().drawEnemy()
@@ -498,15 +677,40 @@ class BurgerEnemy(Enemy):
 
 # chips enemy class
 class ChipsEnemy(Enemy):
+    # see if can move (for stopping), and shooting
+    # loaded - if the shooting cooldown has finished while it couldn't shoot
+    __slots__ = ('canMove', 'canShoot', 'loaded', 'shootTimer')
+
+    # stops moving once within 500 pixels of the player
+    moveKind = movement.FOLLOW_UNTIL_RANGE
+    stopRange = 500
+
+    width = 60
+    height = 70
+    offsetX = (120 - width) / 2
+    offsetY = (120 - height) / 2
+    movementSheet = 'data\\Sprites\\ChipsEnemySS.png'
+    deathSheet = 'data\\Sprites\\ChipsDeathSS.png'
+    speed = 1.5
+    damage = 1
+    maxHealth = 1
+    scoreToGive = 2
+    shootCooldown = 2500
+
     def __init__(self, x, y):
-        super().__init__(x, y, 60, 70, 'data\Sprites\ChipsEnemySS.png',
-                         'data\Sprites\ChipsDeathSS.png', 1.5, 1, 1, 2)
+        self.shootTimer = None
+        super().__init__(x, y)
+
+    def reset(self, x, y):
+        super().reset(x, y)
         # see if can move (for stopping)
         self.canMove = True
         self.canShoot = False
-        self.setLastShoot = True
-        self.shootCooldown = 2500
-        self.lastShoot = pygame.time.get_ticks()
+        # the first shot is a cooldown after spawning
+        # (it could still have a timer from before it went back in its pool)
+        self.loaded = False
+        timers.cancel(self.shootTimer)
+        self.shootTimer = timers.after(self.shootCooldown, self.reload)
 
     def drawEnemy(self):
         return super().drawEnemy()
@@ -532,73 +736,105 @@ class ChipsEnemy(Enemy):
             # so it stops moving once in range
             if distBetween <= 500 and onScreen:
                 self.canMove = False
-                self.canShoot = True
+                if not self.canShoot:
+                    self.startShooting()
             elif self.canMove:
                 # change enemy's position
                 self.x += difX * self.speed
                 self.y += difY * self.speed
 
-            # shooting
-            if self.canShoot:
-                # spawn chip bullets every so often
-                self.now = pygame.time.get_ticks()
-                if self.now - self.lastShoot >= self.shootCooldown:
-                    # spawn bullet at enemy centre
-                    enemyBullets.append(EnemyBullet(self.x + self.width / 2,
-                                                    self.y + self.height / 2, self))
-                    # print(enemyBullets)
-                    self.lastShoot = self.now
-
             # facing directions
             if player.x >= self.x:
                 self.facingDirection = "right"
             elif player.x <= self.x:
                 self.facingDirection = "left"
 
+    # stopped in range of the player - shoot now if the cooldown is already over,
+    # after that the shooting timer shoots
+    def startShooting(self):
+        self.canShoot = True
+        if self.loaded:
+            self.shoot()
+
+    # run by the shooting timer when the cooldown is over
+    def reload(self):
+        self.shootTimer = None
+        if self.health <= 0:
+            return
+        if self.canShoot:
+            self.shoot()
+        else:
+            self.loaded = True
+
+    # spawn a chip bullet and start the cooldown until the next one
+    def shoot(self):
+        # spawn bullet at enemy centre
+        enemyBullets.append(EnemyBullet(self.x + self.width / 2,
+                                        self.y + self.height / 2, self))
+        self.loaded = False
+        self.shootTimer = timers.after(self.shootCooldown, self.reload)
+
     def takeDamage(self, damageToTake, enemiesList):
         return super().takeDamage(damageToTake, enemiesList)
 
 
 # enemy bullet class
 class EnemyBullet:
-    def __init__(self, x, y, parent):
-        self.parent = parent
+    # only these attributes are stored on each bullet (no __dict__)
+    # difX and difY are only used when there is no movement system
+    __slots__ = ('x', 'y', 'rect', 'bulletImg', 'moveSlot', 'hasGotDifs', 'difX', 'difY')
 
-        # load bullet sprite
-        self.bulletImg = pygame.image.load(
-            'data\Sprites\Chip.png').convert_alpha()
-        self.originalImg = self.bulletImg
+    # number of angles the chip sprite is pre-rotated to
+    rotationSteps = 64
+    # the pre-rotated sprites - loaded when the first bullet is made
+    imageFile = 'data\\Sprites\\Chip.png'
+    rotatedImgs = None
 
-        # collision rect
-        self.rect = self.bulletImg.get_rect()
+    # speed
+    speed = 3.5
+
+    # damage
+    damage = 1
 
+    def __init__(self, x, y, parent):
         # bullet coordinates
         self.x = int(x)
         self.y = int(y)
 
-        # speed
-        self.speed = 3.5
-
-        # damage
-        self.damage = 1
-
         # check to only get differences once
         self.hasGotDifs = False
 
         # set rotation relatives
-        self.relX = (player.x + player.width / 2) - \
+        relX = (player.x + player.width / 2) - \
             (parent.x + parent.width / 2)
-        self.relY = (player.y + player.height / 2) - \
+        relY = (player.y + player.height / 2) - \
             (parent.y + parent.height / 2)
 
-    def drawBullet(self):
-        # rotation
-        self.angle = (180 / math.pi) * math.atan2(self.relX, self.relY)
-        self.bulletImg = pygame.transform.rotate(
-            self.originalImg, self.angle)
-        self.rect = self.bulletImg.get_rect()
+        # rotation - the angle never changes, so pick the closest pre-rotated sprite once
+        if EnemyBullet.rotatedImgs is None:
+            EnemyBullet.rotatedImgs = assets.loadRotations(self.imageFile, self.rotationSteps)
+        angle = (180 / math.pi) * math.atan2(relX, relY)
+        self.bulletImg = self.rotatedImgs[assets.rotationIndex(angle, self.rotationSteps)]
 
-        gameDisplay.blit(self.bulletImg, (self.x, self.y))
+        # collision rect
+        self.rect = pygame.Rect(self.x, self.y, 12, 12)
+
+        # start moving with the movement system - towards where the player's centre is now
+        self.moveSlot = None
+        if movementSystem is not None:
+            difX = (player.x + player.width / 2) - self.x
+            difY = (player.y + player.height / 2) - self.y
+            distBetween = math.sqrt(difX ** 2 + difY ** 2) or 1
+            movementSystem.add(self, movement.FIXED,
+                               vx=difX / distBetween * self.speed,
+                               vy=difY / distBetween * self.speed)
+
+    # the bullet's sprite for this frame - (Surface, (x, y), alpha), see drawSprite()
+    def sprite(self):
+        return self.bulletImg, (self.x, self.y), None
+
+    def drawBullet(self):
+        return assets.blit(gameDisplay, self.bulletImg, (self.x, self.y))
 
     def moveInDirOfPlayer(self, player):
         # get difs once
@@ -611,108 +847,230 @@ class EnemyBullet:
             self.hasGotDifs = True
 
         # distance between the 2 objects (pythagoras)
-        self.distBetween = math.sqrt(self.difX ** 2 + self.difY ** 2)
+        distBetween = math.sqrt(self.difX ** 2 + self.difY ** 2)
         # normalise
-        self.difX = self.difX / self.distBetween
-        self.difY = self.difY / self.distBetween
+        self.difX = self.difX / distBetween
+        self.difY = self.difY / distBetween
         # change bullets's position
         self.x += self.difX * self.speed
         self.y += self.difY * self.speed
 
 
 # spawn enemy
-def spawnEnemyAtRanPos(enemyTypesList, enemyTypesWeightsList):
-    # eval() executes a string as a command if it is valid
+def spawnEnemyAtRanPos(enemyTypesList, enemyTypesCumWeightsList):
+    # the wave table stores the enemy factories from enemyRegistry, so they can be
+    # called directly - they reuse a dead enemy from the pool if there is one
     # select a random enemy with respect to their weights (influence when spawning)
-    ranEnemy = random.choices(enemyTypesList, enemyTypesWeightsList)
+    ranEnemy = random.choices(
+        enemyTypesList, cum_weights=enemyTypesCumWeightsList)[0]
     xOrY = random.randint(0, 1)
     randomX = random.randint(0, displayWidth)
     randomY = random.randint(0, displayHeight)
     if xOrY == 0:  # x
         hOrL = random.randint(0, 1)  # on the upside or down side
         if hOrL == 0:  # up
-            stringToEval = str(ranEnemy[0]) + \
-                "(" + str(randomX) + ", " + str(-50) + ")"
-            enemy = eval(stringToEval)
-            enemies.append(enemy)
+            enemies.append(ranEnemy(randomX, -50))
         elif hOrL == 1:  # down
-            stringToEval = str(
-                ranEnemy[0]) + "(" + str(randomX) + ", " + str(displayHeight + 50) + ")"
-            enemy = eval(stringToEval)
-            enemies.append(enemy)
+            enemies.append(ranEnemy(randomX, displayHeight + 50))
     elif xOrY == 1:  # y
         lOrR = random.randint(0, 1)  # on the left side or right side
         if lOrR == 0:  # left
-            stringToEval = str(ranEnemy[0]) + \
-                "(" + str(-90) + ", " + str(randomY) + ")"
-            enemy = eval(stringToEval)
-            enemies.append(enemy)
+            enemies.append(ranEnemy(-90, randomY))
         elif lOrR == 1:  # right
-            stringToEval = str(
-                ranEnemy[0]) + "(" + str(displayWidth + 90) + ", " + str(randomY) + ")"
-            enemy = eval(stringToEval)
-            enemies.append(enemy)
+            enemies.append(ranEnemy(displayWidth + 90, randomY))
 # endregion
 
 
 # region UI
 # text stuff
-def textObjects(text, font, colour):
-    textSurface = font.render(text, True, colour)
+# the font and the rendered text both come from the asset cache, so text that
+# hasn't changed since the last frame is just blitted again
+fontFile = 'data\\pixelfont2.ttf'
+# every size of text the game uses (for preloading)
+fontSizes = (20, 30, 35, 100, 220)
+
+
+def textObjects(text, fontSize, colour):
+    textSurface = assets.renderText(fontFile, text, fontSize, colour)
     return textSurface, textSurface.get_rect()
 
 
-def messageDisplay(text, fontSize, textX, textY, colour):
-    largeText = pygame.font.Font('data\pixelfont2.ttf', fontSize)
-    textSurf, textRect = textObjects(text, largeText, colour)
+def messageDisplay(text, fontSize, textX, textY, colour, display=None):
+    textSurf, textRect = textObjects(text, fontSize, colour)
     textRect.center = (textX, textY)
-    gameDisplay.blit(textSurf, textRect)
+    if display is None:
+        display = gameDisplay
+    return assets.blit(display, textSurf, textRect)
 
 
 # button stuff
 def drawButton(display, width, height, x, y, buttonColourInactive, buttonColourActive, buttonText, fontSize, textColour, action=None):
     # if mouse in boundary
-    mouse = pygame.mouse.get_pos()
-    click = pygame.mouse.get_pressed()
     x = x - width / 2
-    if x + width > mouse[0] > x and y + height > mouse[1] > y:
-        pygame.draw.rect(display, buttonColourActive, (x, y, width, height))
+    if currentInput.mouseIn(x, y, width, height):
+        buttonRect = pygame.draw.rect(
+            display, buttonColourActive, (x, y, width, height))
 
-        # button functionality
-        if click[0] == 1 and action != None:
+        # button functionality - only on the frame it was clicked
+        if currentInput.clickedIn(x, y, width, height) and action != None:
             action()
     else:
-        pygame.draw.rect(display, buttonColourInactive, (x, y, width, height))
+        buttonRect = pygame.draw.rect(
+            display, buttonColourInactive, (x, y, width, height))
     # button text
-    messageDisplay(buttonText, fontSize, x + width /
-                   2, y + height / 2, textColour)
+    textRect = messageDisplay(buttonText, fontSize, x + width /
+                              2, y + height / 2, textColour)
+    return buttonRect.union(textRect)
 
 
 def drawTextOnlyButton(display, width, height, x, y, buttonColour, buttonText, fontSize, textColourInactive, textColourActive, action=None):
     # this button is for pressing a button that is just text with no box around it
     # if mouse in boundary
-    mouse = pygame.mouse.get_pos()
-    click = pygame.mouse.get_pressed()
     x = x - width / 2
-    if x + width > mouse[0] > x and y + height > mouse[1] > y:
-        pygame.draw.rect(display, buttonColour, (x, y, width, height))
+    if currentInput.mouseIn(x, y, width, height):
+        buttonRect = pygame.draw.rect(
+            display, buttonColour, (x, y, width, height))
 
-        # button functionality
-        if click[0] == 1 and action != None:
+        # button functionality - only on the frame it was clicked
+        if currentInput.clickedIn(x, y, width, height) and action != None:
             action()
 
-        messageDisplay(buttonText, fontSize, x + width /
-                       2, y + height / 2, textColourActive)
+        textRect = messageDisplay(buttonText, fontSize, x + width /
+                                  2, y + height / 2, textColourActive)
     else:
-        pygame.draw.rect(display, buttonColour, (x, y, width, height))
+        buttonRect = pygame.draw.rect(
+            display, buttonColour, (x, y, width, height))
         # button text
-        messageDisplay(buttonText, fontSize, x + width /
-                       2, y + height / 2, textColourInactive)
+        textRect = messageDisplay(buttonText, fontSize, x + width /
+                                  2, y + height / 2, textColourInactive)
+    return buttonRect.union(textRect)
+
+
+# is the mouse over a button - x is the centre of the button, like the button functions
+def isMouseOver(width, height, x, y):
+    return currentInput.mouseIn(x - width / 2, y, width, height)
+
+
+# was a button clicked this frame - same arguments as isMouseOver
+def isClicked(width, height, x, y):
+    return currentInput.clickedIn(x - width / 2, y, width, height)
+
+
+# cached hud layers - each one is only drawn again when what it shows changes
+# (see data/hud.py), the rest of the time it's one blit
+
+# hearts - background for each heart the player can have, then the ones they have left
+def renderHearts(maxHealth, currentHealth):
+    surface = pygame.Surface((maxHealth * 58, 56), pygame.SRCALPHA)
+    heartImgs = heartSS.images_at(heartRects, black)
+    # prints each heart with space between each other
+    for i in range(0, maxHealth):
+        surface.blit(heartImgs[1], (i * 48 + i * 10, 0))
+    for i in range(0, currentHealth):
+        surface.blit(heartImgs[0], (i * 48 + i * 10, 0))
+    return surface, (15, 15)
+
+
+# score in the top right
+def renderScore(score, width):
+    textSurf, textRect = textObjects(str(score).zfill(7), 35, white)  # .zfill() pads with 0s
+    textRect.center = (width - 87.5, 47.5)
+    return textSurf, textRect.topleft
+
+
+# wave name and progress bar at the top
+# progress - how much of the bar is filled in pixels, or None on the final wave (endless mode)
+def renderWaveBar(text, progress, width):
+    textSurf, textRect = textObjects(text, 30, white)
+    textRect.center = (width / 2, 30)
+    barRect = pygame.Rect(width / 2 - 350, 50, 700, 15)
+    area = textRect.union(barRect)
+    surface = pygame.Surface(area.size, pygame.SRCALPHA)
+    # text antialiasing is copied straight onto the transparent surface rather than blended
+    surface.blit(textSurf, textRect.move(-area.x, -area.y), special_flags=pygame.BLEND_RGBA_MAX)
+    barRect.move_ip(-area.x, -area.y)
+    if progress is None:
+        # background
+        pygame.draw.rect(surface, leafGreen, barRect)
+    else:
+        # progress bar background
+        pygame.draw.rect(surface, black, barRect)
+        # progress bar
+        pygame.draw.rect(surface, leafGreen, (barRect.x, barRect.y, progress, 15))
+    return surface, area.topleft
+
+
+# the death screen's buttons - (width, height, x, y) for isMouseOver, from the screen size
+def deathScreenButtons(width, height):
+    respawnButton = (145, 30, width / 2, height / 2 + 230)
+    quitButton = (200, 26, width / 2, height / 2 + 275)
+    return respawnButton, quitButton
+
+
+# the whole death screen - covers the whole screen
+def renderDeathScreen(score, highscore, width, height, respawnHovered, quitHovered):
+    surface = pygame.Surface((width, height)).convert()
+    # black game over box
+    surface.fill(black)
+
+    # death text
+    messageDisplay("You Died!", 220, width / 2, height / 2 - 20, appleRed, surface)
+
+    # score
+    messageDisplay("Your score: " + str(score), 35, width / 2, height / 2 + 115, white, surface)
+    # highscore
+    messageDisplay("Highscore: " + str(highscore), 35, width / 2, height / 2 + 160, white, surface)
+
+    # respawn and quit - the box is the same colour as the background, so only the text is drawn
+    respawnButton, quitButton = deathScreenButtons(width, height)
+    buttonWidth, buttonHeight, x, y = respawnButton
+    messageDisplay("Respawn", 35, x, y + buttonHeight / 2,
+                   lightLeafGreen if respawnHovered else leafGreen, surface)
+    buttonWidth, buttonHeight, x, y = quitButton
+    messageDisplay("Quit to Menu", 35, x, y + buttonHeight / 2,
+                   lightAppleRed if quitHovered else appleRed, surface)
+    return surface, (0, 0)
+
+
+heartsLayer = hud.Layer(renderHearts)
+scoreLayer = hud.Layer(renderScore)
+waveBarLayer = hud.Layer(renderWaveBar)
+deathScreenLayer = hud.Layer(renderDeathScreen)
+
+
+# profiler overlay - lines of text in a translucent box in the bottom left
+def renderProfilerOverlay(lines, height):
+    textSurfs = [textObjects(line, 20, white)[0] for line in lines]
+    width = max(textSurf.get_width() for textSurf in textSurfs) + 20
+    lineHeight = textSurfs[0].get_height()
+    surface = pygame.Surface((width, lineHeight * len(lines) + 20), pygame.SRCALPHA)
+    surface.fill((0, 0, 0, 160))
+    for i, textSurf in enumerate(textSurfs):
+        surface.blit(textSurf, (10, 10 + i * lineHeight))
+    return surface, (10, height - surface.get_height() - 10)
+
+
+# the overlay's text - fps, time per phase, entity counts
+def profilerOverlayLines():
+    lines = ["FPS %.0f" % profiler.fps()]
+    for name, ms in profiler.averages().items():
+        lines.append("%s %.2f ms" % (name, ms))
+    counters = profiler.counters()
+    lines.append(" ".join("%s %d" % (name, value) for name, value in counters.items()))
+    return tuple(lines)
+
+
+profilerLayer = hud.Layer(renderProfilerOverlay)
+profilerLines = ("FPS 0",)
 # endregion
 
 
 # quit game procedure
 def quitGame():
+    # make sure the highscores, profiler trace and replay have been saved before quitting
+    finishRecording()
+    profiler.stopTrace()
+    scoreStore.flush()
     pygame.quit()
     quit()
 
@@ -720,6 +1078,7 @@ def quitGame():
 # play game
 def playGame():
     global canPlayGame
+    recordInput(replays.PLAY)
     canPlayGame = True
     player.respawn()
 
@@ -727,131 +1086,255 @@ def playGame():
 # quit to menu
 def quitToMenu():
     global canPlayGame
+    recordInput(replays.MENU)
     canPlayGame = False
 
 
-# player initialisation
-# subtracting half of length of the player centres it properly as (0, 0) = top left corner
-player = Player(displayWidth / 2 - 30, displayHeight / 2 - 35)
+# replay recording
+# start recording - picks a random seed and seeds the game with it, so the replay can use it too
+def startRecording(filename):
+    global replayRecorder
+    seed = random.randrange(2 ** 32)
+    random.seed(seed)
+    width, height = pygame.display.get_surface().get_size()
+    replayRecorder = replays.ReplayRecorder(filename, seed, width, height, tickRate)
+
+
+# record an input, on the tick it will affect
+def recordInput(kind, a=0, b=0):
+    if replayRecorder is not None:
+        replayRecorder.record(simClock.tickCount, kind, a, b)
+
+
+# record an event from the event queue if it's an input
+def recordEvent(event):
+    if replayRecorder is None:
+        return
+    if event.type == pygame.KEYDOWN:
+        recordInput(replays.KEYDOWN, event.key)
+    elif event.type == pygame.KEYUP:
+        recordInput(replays.KEYUP, event.key)
+    elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+        recordInput(replays.MOUSEDOWN, *event.pos)
+    elif event.type == pygame.MOUSEBUTTONUP and event.button == 1:
+        recordInput(replays.MOUSEUP, *event.pos)
+
+
+# finish the replay file
+def finishRecording():
+    global replayRecorder
+    if replayRecorder is not None:
+        replayRecorder.close(simClock.tickCount, player.score, player.waveNumber)
+        replayRecorder = None
+
+
+# enemy pools - enemies that have died are kept here and reused
+enemyPools = {enemyClass: pools.ObjectPool(enemyClass)
+              for enemyClass in (TacoEnemy, BurgerEnemy, ChipsEnemy)}
+
+# death animations - a dying enemy hands its animation to these and leaves the enemies list
+effects = EffectPool(capacity=512)
+
+# enemy registry - the EnemyTypes names in WaveData.json -> function to make that enemy
+# the wave table checks every name in the file is in here when it loads
+enemyRegistry = {enemyClass.__name__: pool.acquire
+                 for enemyClass, pool in enemyPools.items()}
+
+# wave table - WaveData.json is only read by bootstrap() (and again if watched and saved)
+waveTable = None
+
+# the player - made by bootstrap()
+player = None
+
+# stop an entity being moved by the movement system
+def stopMoving(entity):
+    if movementSystem is not None:
+        movementSystem.remove(entity)
+
+
+# give an enemy taken out of the enemies list back to its pool
+def releaseEnemy(enemy):
+    stopMoving(enemy)
+    enemyPools[type(enemy)].release(enemy)
+
 
 # enemy initialisation
-enemies = []
+# EntityLists - removing is O(1) and safe while looping, compactEntities() tidies them each tick
+# anything taken out of them also stops being moved
+enemies = EntityList(releaseEnemy)
 
 # bullets initialisation
-bullets = []
-enemyBullets = []
+bullets = EntityList(stopMoving)
+enemyBullets = EntityList(stopMoving)
 
 
-# what to redraw and update every frame
+# actually remove the entities that were removed this tick
+def compactEntities():
+    enemies.compact()
+    bullets.compact()
+    enemyBullets.compact()
+
+
+# renderer - clears and updates the screen each frame, made by bootstrap()
+renderer = None
+
+
+# what to redraw every frame - this only draws, the game is updated by simulationTick()
 def updateFrame():
-    # draw background
-    gameDisplay.fill(greyBackground)
+    drawFrame()
+    # update
+    with profiler.scope("display"):
+        renderer.update()
+
+
+# draw everything to the display, one pass at a time (see drawPasses)
+# everything drawn is passed to renderer.add() so dirty rect mode knows what changed
+def drawFrame():
+    if profiler.enabled:
+        for name, drawPass in drawPasses:
+            profiler.run("draw " + name, drawPass)
+    else:
+        for name, drawPass in drawPasses:
+            drawPass()
+
+
+# draw one (Surface, (x, y), alpha) from a sprite() or a draw list - alpha None leaves the Surface's alpha alone
+# returns the rect drawn on, or None if sprite is None
+def drawSprite(sprite):
+    if sprite is None:
+        return None
+    image, position, alpha = sprite
+    if alpha is not None and image.get_alpha() != alpha:
+        # keep the RLE from the asset loader (set_alpha turns it off otherwise)
+        image.set_alpha(alpha, pygame.RLEACCEL)
+    return assets.blit(gameDisplay, image, position)
+
+
+# everything in the game world for a frame, in the order it's drawn - a tuple of (Surface, (x, y), alpha)
+# positions are copied, so it doesn't change when the entities move on (see usePipelining)
+def buildDrawList():
+    drawList = [bullet.sprite() for bullet in bullets]
+    drawList += [bullet.sprite() for bullet in enemyBullets]
+    drawList.append(player.sprite())
+    drawList += effects.sprites()
+    for enemy in enemies:
+        sprite = enemy.sprite()
+        if sprite is not None:
+            drawList.append(sprite)
+    return tuple(drawList)
+
 
-    # draw bullets
+# draw a frame from draw lists, without looking at the entities - used while the next ticks are simulated
+def drawFromList(drawList):
+    renderer.clear()
+    for sprite in drawList:
+        renderer.add(drawSprite(sprite))
+
+
+# draw background
+def drawBackground():
+    renderer.clear()
+
+
+# draw bullets
+def drawBullets():
     for bullet in bullets:
-        bullet.drawBullet()
-        # move bullet rect (for collisions)
-        bullet.rect = pygame.Rect(bullet.x, bullet.y, 12, 12)
+        renderer.add(bullet.drawBullet())
     # enemy bullets
     for bullet in enemyBullets:
-        bullet.drawBullet()
-        bullet.moveInDirOfPlayer(player)
-        # move bullet rect (for collisions)
-        bullet.rect = pygame.Rect(bullet.x, bullet.y, 12, 12)
+        renderer.add(bullet.drawBullet())
+
+
+# draw player
+def drawPlayerPass():
+    renderer.add(player.drawPlayer())
 
-    # draw player
-    player.drawPlayer()
 
-    # draw enemies
+# draw enemies
+def drawEnemies():
     for enemy in enemies:
-        enemy.drawEnemy()
-        # move enemy rect (for collisions)
-        if not enemy.health <= 0:  # if the enemy is not dead
-            enemy.rect = pygame.Rect(
-                enemy.x, enemy.y, enemy.width, enemy.height)
-        # if enemy deaf
-        elif enemy.health <= 0:
-            # draw the rectangle as 0 width 0 height - it basically doesn't exist
-            enemy.rect = pygame.Rect(enemy.x, enemy.y, 0, 0)
+        renderer.add(enemy.drawEnemy())
+
+
+# draw death animations - under the enemies that are still alive
+def drawEffects():
+    for sprite in effects.sprites():
+        renderer.add(drawSprite(sprite))
+
+
+# draw the profiler overlay on top of everything
+def drawProfiler():
+    for sprite in profilerSprites():
+        renderer.add(drawSprite(sprite))
+
+
+# the profiler overlay's sprite, if it's showing - a list of (Surface, (x, y), alpha)
+def profilerSprites():
+    global profilerLines
+    if not profiler.showOverlay:
+        return []
+    # only change the numbers every so often, so they can be read
+    if profiler.frameCount % profilerOverlayRefresh == 0:
+        profilerLines = profilerOverlayLines()
+    surface, position = profilerLayer.update((profilerLines, displayHeight))
+    return [(surface, position, None)]
+
+
+# the hud's sprites while playing - a list of (Surface, (x, y), alpha)
+def hudSprites():
+    # score
+    layers = [scoreLayer.update((player.score, displayWidth)),
+              # heart backgrounds and player's health
+              heartsLayer.update((player.maxHealth, player.currentHealth))]
+
+    # waves stuff
+    # check if enough waves in json file
+    # if on final wave
+    if player.waveNumber == len(waveTable):
+        layers.append(waveBarLayer.update((str(player.waveName), None, displayWidth)))
+    # if not on final wave
+    elif player.waveNumber - 1 < len(waveTable):
+        # get number of enemies that need to be killed
+        percentKilled = (player.enemiesKilled / player.toKill) * 700
+        # wave text
+        if player.waveCompleted:
+            waveText = "Wave Completed!"
+        else:
+            waveText = str(player.waveName)
+        layers.append(waveBarLayer.update((waveText, percentKilled, displayWidth)))
+    return [(surface, position, None) for surface, position in layers]
+
 
+# draw the hud, death screen or menu
+def drawUI():
     # region UI
     if canPlayGame:
         if not player.playerDead:
-            # score
-            messageDisplay(str(player.score).zfill(
-                7), 35, displayWidth - 87.5, 47.5, white)  # .zfill() pads with 0s
-            # prints each heart with space between each other
-            # heart backgrounds
-            for i in range(0, player.maxHealth):
-                gameDisplay.blit(heartImgs[1], (15 + i * 48 + i * 10, 15))
-            # player's health
-            for i in range(0, player.currentHealth):
-                gameDisplay.blit(heartImgs[0], (15 + i * 48 + i * 10, 15))
-
-            # waves stuff
-            # check if enough waves in json file
-            # if on final wave
-            if player.waveNumber == len(player.data):
-                messageDisplay(str(player.waveName), 30,
-                               displayWidth / 2, 30, white)
-                # progress bar
-                # background
-                pygame.draw.rect(gameDisplay, leafGreen,
-                                 (displayWidth / 2 - 350, 50, 700, 15))
-            # if not on final wave
-            elif player.waveNumber - 1 < len(player.data):
-                # get number of enemies that need to be killed
-                percentKilled = (player.enemiesKilled / player.toKill) * 700
-                # progress bar background
-                pygame.draw.rect(gameDisplay, black,
-                                 (displayWidth / 2 - 350, 50, 700, 15))
-                # progress bar
-                pygame.draw.rect(gameDisplay, leafGreen,
-                                 (displayWidth / 2 - 350, 50, percentKilled, 15))
-                # wave text
-                if player.waveCompleted:
-                    messageDisplay("Wave Completed!", 30,
-                                   displayWidth / 2, 30, white)
-                else:
-                    messageDisplay(str(player.waveName), 30,
-                                   displayWidth / 2, 30, white)
+            # score, hearts and wave bar
+            for sprite in hudSprites():
+                renderer.add(drawSprite(sprite))
         # if player is dead draw the death screen ui
         else:
-            # if havent drawn it yet, wait 1.25 seconds
-            if not player.canDrawDeathScreen:
-                drawDeathScreenCooldown = 1250
-                nowDraw = pygame.time.get_ticks()
-                if nowDraw - player.diedAt > drawDeathScreenCooldown:
-                    player.canDrawDeathScreen = True
-            else:
-                # black game over box
-                pygame.draw.rect(gameDisplay, black,
-                                 (0, 0, displayWidth, displayHeight))
-
-                # death text
-                messageDisplay("You Died!", 220, displayWidth /
-                               2, displayHeight / 2 - 20, appleRed)
-
-                # score
-                messageDisplay("Your score: " + str(player.score), 35, displayWidth /
-                               2, displayHeight / 2 + 115, white)  # .zfill() pads with 0s
-                # highscore
-                f = open('data\highscore.txt', "r")
-                highscore = f.readline()
-                f.close()
-                messageDisplay("Highscore: " + str(highscore), 35, displayWidth / 2,
-                               displayHeight / 2 + 160, white)  # .zfill() pads with 0s
-
-                # respawn
-                drawTextOnlyButton(gameDisplay, 145, 30, displayWidth / 2, displayHeight /
-                                   2 + 230, black, "Respawn", 35, leafGreen, lightLeafGreen, playGame)
-
-                # quit
-                drawTextOnlyButton(gameDisplay, 200, 26, displayWidth / 2, displayHeight /
-                                   2 + 275, black, "Quit to Menu", 35, appleRed, lightAppleRed, quitToMenu)
+            # player.update() waits 1.25 seconds before this can be drawn
+            if player.canDrawDeathScreen:
+                # the death screen covers the whole screen
+                renderer.invalidate()
+                respawnButton, quitButton = deathScreenButtons(displayWidth, displayHeight)
+                respawnHovered = isMouseOver(*respawnButton)
+                quitHovered = isMouseOver(*quitButton)
+                deathScreenLayer.draw(gameDisplay, (player.score, scoreStore.highscore,
+                                                    displayWidth, displayHeight,
+                                                    respawnHovered, quitHovered))
+
+                # respawn and quit
+                if isClicked(*respawnButton):
+                    playGame()
+                elif isClicked(*quitButton):
+                    quitToMenu()
     else:
-        # menu stuff
-        gameDisplay.blit(menuImg, (0, 0))
+        # menu stuff - covers the whole screen
+        renderer.invalidate()
+        assets.blit(gameDisplay, assets.loadImage(menuImageFile), (0, 0))
         # play game
         fontsize = 100
         drawTextOnlyButton(gameDisplay, (2.25 * fontsize), (0.9 * fontsize), displayWidth / 2, displayHeight /
@@ -860,25 +1343,454 @@ def updateFrame():
                            2 + 300 / 2, greyBackground, "Quit", fontsize, appleRed, lightAppleRed, quitGame)
     # endregion
 
+
+# the passes of a frame, in the order they are drawn
+drawPasses = (
+    ("background", drawBackground),
+    ("bullets", drawBullets),
+    ("player", drawPlayerPass),
+    ("effects", drawEffects),
+    ("enemies", drawEnemies),
+    ("ui", drawUI),
+    ("profiler", drawProfiler),
+)
+
+
+# start a new game from scratch - used by the headless tools so runs don't affect each other
+def resetGame():
+    global player
+    global simClock
+    global timers
+    global fireTimer
+    global spawnTimer
+    enemies.clear()
+    bullets.clear()
+    enemyBullets.clear()
+    effects.clear()
+    # the settings could have changed since the last game
+    makeSystems()
+    simClock = SimClock(tickRate)
+    timers = Timers(simClock)
+    fireTimer = timers.cooldown(shootCooldown)
+    spawnTimer = timers.cooldown(spawnCooldown)
+    player = Player(displayWidth / 2 - 30, displayHeight / 2 - 35)
+
+
+# collision broad phases - rebuilt every tick, made by makeSystems()
+enemyGrid = None
+enemyBulletGrid = None
+
+
+# make the movement system and the collision broad phases from the current settings
+# (useVectorMovement and collisionMode) - only while nothing is moving
+def makeSystems():
+    global movementSystem
+    global enemyGrid
+    global enemyBulletGrid
+    if useVectorMovement and movement.available:
+        movementSystem = movement.MovementSystem()
+    else:
+        movementSystem = None
+    enemyGrid = collision.makeBroadPhase(collisionMode)
+    enemyBulletGrid = collision.makeBroadPhase(collisionMode)
+
+
+# handle one event from the event queue
+def handleEvent(event):
+    # toggle the profiler overlay
+    if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+        profiler.showOverlay = not profiler.showOverlay
+
+    # if player dead = cant move
+    if not player.playerDead and canPlayGame:
+        # player movement on key down and player stop on key up
+        if event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_LEFT or event.key == pygame.K_a:
+                player.leftPressed = True
+            if event.key == pygame.K_RIGHT or event.key == pygame.K_d:
+                player.rightPressed = True
+            if event.key == pygame.K_UP or event.key == pygame.K_w:
+                player.upPressed = True
+            if event.key == pygame.K_DOWN or event.key == pygame.K_s:
+                player.downPressed = True
+
+        if event.type == pygame.KEYUP:
+            if event.key == pygame.K_LEFT or event.key == pygame.K_a:
+                player.leftPressed = False
+            if event.key == pygame.K_RIGHT or event.key == pygame.K_d:
+                player.rightPressed = False
+            if event.key == pygame.K_UP or event.key == pygame.K_w:
+                player.upPressed = False
+            if event.key == pygame.K_DOWN or event.key == pygame.K_s:
+                player.downPressed = False
+
+
+# the simulation is split into phases, run in order by simulationTick()
+# (benchmark.py times each one separately)
+
+
+# is the game being played - not in the menu and the player isn't dead
+def isPlaying():
+    return canPlayGame and not player.playerDead
+
+
+# advance the death animations of enemies killed on earlier ticks
+def animateEffects():
+    effects.update()
+
+
+# move bullets and enemies, and destroy bullets that have left the screen
+def moveEntities():
+    # if player is dead - stop all these things
+    if not isPlaying():
+        return
+
+    if movementSystem is None:
+        # move or destory bullets
+        for bullet in bullets:
+            # only move if within screen
+            if bullet.x < displayWidth and bullet.x > 0 and bullet.y < displayHeight and bullet.y > 0:
+                if "left" in bullet.facing or "right" in bullet.facing:
+                    bullet.x += bullet.speed
+                elif bullet.facing == "up" or bullet.facing == "down":
+                    bullet.y += bullet.speed
+            else:
+                # remove bullet
+                bullets.remove(bullet)
+
+        # enemy bullet collision with screen
+        for bullet in enemyBullets:
+            # only move if within screen
+            if not (bullet.x < displayWidth and bullet.x > 0 and bullet.y < displayHeight and bullet.y > 0):
+                # remove bullet
+                enemyBullets.remove(bullet)
+
+        # move enemies
+        for enemy in enemies:
+            enemy.followPlayer(player)
+    else:
+        # move all enemies and bullets at once, and destroy bullets off screen
+        culled, stopped = movementSystem.step(
+            player.x, player.y, displayWidth, displayHeight)
+        for bullet in culled:
+            # remove does nothing if it is in the other list
+            bullets.remove(bullet)
+            enemyBullets.remove(bullet)
+        # chips enemies that got in range stop and start shooting
+        for enemy in stopped:
+            enemy.canMove = False
+            enemy.startShooting()
+        movementSystem.sync(player.x)
+
+
+# run the cooldowns and delays that are due this tick (chips enemies shoot from here)
+# this is after movement, so new chip bullets don't move until the next tick
+def runTimers():
+    timers.update()
+
+
+# player shooting and enemy spawning
+def spawnEntities():
+    if not isPlaying():
+        return
+
+    # shoot if press space and the shooting cooldown is over
+    if player.shootPressed and fireTimer.use():
+        bullets.append(Bullet(player.x + player.width / 2,
+                              player.y + player.height / 2, player.facingDirection))
+
+    # spawn enemies
+    # during wave mode - limited spawns, endless mode - endless spawns
+    if player.waveNumber < len(waveTable) and player.enemiesSpawned >= player.toKill:
+        return
+    if spawnTimer.use():
+        spawnEnemyAtRanPos(
+            player.enemyTypesForWave, player.enemyCumWeightsForWave)
+        player.enemiesSpawned += 1
+
+
+# collisions with the walls, enemies and enemy bullets
+def checkCollisions():
+    if not isPlaying():
+        return
+
+    # player collisions with the wall
+    if player.x > displayWidth - player.width:
+        player.hasCollidedRight = True
+    elif player.x < 0:
+        player.hasCollidedLeft = True
+    else:
+        player.hasCollidedRight = False
+        player.hasCollidedLeft = False
+
+    if player.y > displayHeight - player.height:
+        player.hasCollidedDown = True
+    elif player.y < 0:
+        player.hasCollidedUp = True
+    else:
+        player.hasCollidedUp = False
+        player.hasCollidedDown = False
+
+    # put enemies and enemy bullets in the broad phase so each check
+    # only looks at the things near it (dead enemies have already left the list)
+    enemyGrid.build(enemies)
+    enemyBulletGrid.build(enemyBullets)
+
+    # collisions between bullet and enemies
+    for bullet in bullets:
+        for enemy in enemyGrid.query(bullet.rect):
+            # check enemy is still alive, it could have been killed by another bullet
+            if not enemy.health <= 0:
+                # remove bullet from bullet list
+                if bullet in bullets:
+                    bullets.remove(bullet)
+                # make enemy take damage
+                enemy.takeDamage(1, enemies)
+
+    # collisions between player and enemies
+    for enemy in enemyGrid.query(player.rect):
+        if player.hitTimer.use():   # invulnerability cooldown
+            player.takeDamage(enemy.damage)
+
+    # collisions between player and enemy bullets
+    for bullet in enemyBulletGrid.query(player.rect):
+        if bullet in enemyBullets:
+            if player.hitTimer.use():   # invulnerability cooldown
+                player.takeDamage(bullet.damage)
+                # destroy bullet
+                enemyBullets.remove(bullet)
+
+
+# if player is dead - kill everything and save the highscore
+def handlePlayerDeath():
+    if not (canPlayGame and player.playerDead):
+        return
+
+    # set to not transparent
+    player.alpha = 255
+    # kill all enemies
+    for enemy in enemies:
+        # set enemy health to 0
+        enemy.health = 0
+        enemy.die(enemies)
+    # remove all bullets
+    bullets.clear()
+    enemyBullets.clear()
+    # reset player's velocity and 'pressed' bools
+    player.playerVelocity[0] = 0
+    player.playerVelocity[1] = 0
+    player.leftPressed = False
+    player.rightPressed = False
+    player.upPressed = False
+    player.downPressed = False
+
+    # log highcore - once per death, the files are written in the background
+    if saveHighscores and not player.scoreSaved:
+        scoreStore.addScore(player.score, player.waveNumber)
+        player.scoreSaved = True
+
+
+# update rects and the player, then end the tick
+def updateEntities():
+    # move bullet rects (for collisions)
+    for bullet in bullets:
+        bullet.rect = pygame.Rect(bullet.x, bullet.y, 12, 12)
+    for bullet in enemyBullets:
+        # the movement system moves enemy bullets with everything else
+        if movementSystem is None:
+            bullet.moveInDirOfPlayer(player)
+        bullet.rect = pygame.Rect(bullet.x, bullet.y, 12, 12)
+
+    # move enemy rects (for collisions)
+    for enemy in enemies:
+        enemy.rect = pygame.Rect(
+            enemy.x, enemy.y, enemy.width, enemy.height)
+
     # update
     player.update()
+
+    # end of the tick - take out everything removed this tick
+    compactEntities()
+    simClock.advance()
+
+
+# the phases of a tick, in order
+simulationPhases = (
+    ("animation", animateEffects),
+    ("movement", moveEntities),
+    ("timers", runTimers),
+    ("spawn", spawnEntities),
+    ("collision", checkCollisions),
+    ("death", handlePlayerDeath),
+    ("update", updateEntities),
+)
+
+
+# advance the game by one fixed tick
+# this is everything that changes the game (player, waves, spawning, collisions,
+# scoring) and none of the drawing, so it can be run with no display
+# all timing uses simClock, which moves on by one tick at the end
+def simulationTick():
+    if profiler.enabled:
+        for name, phase in simulationPhases:
+            profiler.run(name, phase)
+    else:
+        for name, phase in simulationPhases:
+            phase()
+
+
+# run a frame's ticks
+def runTicks(ticks):
+    for i in range(ticks):
+        simulationTick()
+
+
+# run a frame's ticks and make the draw list of what they left - on the worker thread when pipelining
+def simulateFrame(ticks):
+    runTicks(ticks)
+    return buildDrawList()
+
+
+# every scope the profiler can time in a frame, for the trace file's columns
+def profilerScopes():
+    return (["events"] + [name for name, phase in simulationPhases] +
+            ["draw " + name for name, drawPass in drawPasses] + ["draw pipelined", "display"])
+
+
+# add how long a part of starting up took - from the last part to now
+def startupStep(name):
+    global lastStartupStep
+    now = time.perf_counter()
+    startupTimes[name] = now - lastStartupStep
+    lastStartupStep = now
+
+
+def printStartupTimes():
+    print("Startup: " + ", ".join("%s %.1f ms" % (name, seconds * 1000)
+                                  for name, seconds in startupTimes.items()) +
+          " - total %.1f ms" % (sum(startupTimes.values()) * 1000))
+
+
+# every asset the game uses, for assets.preload()
+def assetList():
+    # fonts first, so the loading screen can use them
+    items = [('font', fontFile, size) for size in fontSizes]
+    items.append(('image', menuImageFile))
+    items.append(('frames', heartSS.filename, heartRects, black))
+    items.append(('frames', Player.sheetFile, Player.sheetRects, black))
+    items.append(('image', Player.deathImageFile))
+    items.append(('image', Bullet.imageFile))
+    items.append(('rotations', EnemyBullet.imageFile, EnemyBullet.rotationSteps))
+    for enemyClass in enemyPools:
+        items.append(('frames', enemyClass.movementSheet, enemyClass.movementRects(), black))
+        items.append(('frames', enemyClass.deathSheet, enemyClass.deathRects, black))
+    return items
+
+
+# loading screen - called by assets.preload() after each asset is loaded
+def drawLoadingScreen(loaded, total):
+    width, height = gameDisplay.get_size()
+    gameDisplay.fill(greyBackground)
+    messageDisplay("Loading", 100, width / 2, height / 2 - 40, white)
+    # progress bar, like the wave bar
+    barRect = pygame.Rect(width / 2 - 350, height / 2 + 40, 700, 15)
+    pygame.draw.rect(gameDisplay, black, barRect)
+    pygame.draw.rect(gameDisplay, leafGreen, (barRect.x, barRect.y, 700 * loaded / total, 15))
     pygame.display.update()
+    # keep the window responding (the events stay queued for the first frame)
+    pygame.event.pump()
+
+
+# load everything before the menu, so nothing is loaded mid-game
+def preloadAssets():
+    assets.preload(assetList(), drawLoadingScreen)
+    # put the enemy frames on their classes now rather than at their first spawn
+    for enemyClass in enemyPools:
+        enemyClass.loadSprites()
+
+
+# start the game up - open the window and read what the menu and first game need
+# only pygame's display and font are started (nothing else is used)
+# does nothing if it has already been called
+def bootstrap():
+    global lastStartupStep
+    global gameDisplay
+    global clock
+    global inputState
+    global currentInput
+    global scoreStore
+    global waveTable
+    global player
+    global renderer
+    if gameDisplay is not None:
+        return
+    lastStartupStep = time.perf_counter()
+
+    pygame.display.init()
+    # set the caption of the window
+    pygame.display.set_caption('Invasion of the Tacos')
+    gameDisplay = pygame.display.set_mode(
+        (displayWidth, displayHeight), pygame.FULLSCREEN)
+    clock = pygame.time.Clock()
+    inputState = inputs.InputState(pygame.mouse.get_pos())
+    currentInput = inputState.snapshot
+    startupStep("display")
+
+    pygame.font.init()
+    startupStep("fonts")
+
+    if usePreloader:
+        preloadAssets()
+        startupStep("assets")
+
+    scoreStore = scores.ScoreStore(assets.resolvePath('data\\highscore.txt'),
+                                   assets.resolvePath('data\\leaderboard.json'))
+    startupStep("scores")
+
+    waveTable = wv.WaveTable(assets.resolvePath('data\\WaveData.json'), enemyRegistry,
+                             watch=watchWaveData)
+    startupStep("waves")
+
+    makeSystems()
+
+    # subtracting half of length of the player centres it properly as (0, 0) = top left corner
+    player = Player(displayWidth / 2 - 30, displayHeight / 2 - 35)
+    startupStep("player")
+
+    renderer = render.Renderer(gameDisplay, greyBackground, useDirtyRects)
+    startupStep("renderer")
 
 
 # main game loop
+# runs fixed simulation ticks to keep up with real time, then draws a frame
 def gameLoop():
     gameRunning = True
 
     # global variables used
-    global lastFire
-    global lastSpawn
-    global lastHit
+    global displayWidth
+    global displayHeight
+    global currentInput
+
+    bootstrap()
+
+    # real time that hasn't been simulated yet, in milliseconds
+    lag = 0
+
+    # simulates the next frame while this one is drawn, if pipelining
+    simWorker = ThreadPoolExecutor(max_workers=1) if usePipelining else None
+    # what to draw this frame when pipelining - made by the last frame's simulation
+    drawList = None
+
+    if profileTraceFile is not None:
+        profiler.startTrace(profileTraceFile, profilerScopes())
+    if recordReplayFile is not None:
+        startRecording(recordReplayFile)
 
     # game loop
     while gameRunning:
 
         # set the framefrate
-        clock.tick(120)
+        lag += clock.tick(120)
 
         # updates variables if window size changes
         displayWidth = pygame.display.get_surface().get_width()
@@ -886,187 +1798,72 @@ def gameLoop():
 
         # events
         #################################
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT:
+        with profiler.scope("events"):
+            # the only place the event queue is read - everything else uses currentInput
+            currentInput = inputState.update(pygame.event.get())
+            if currentInput.quit:
                 gameRunning = False
+            for event in currentInput.events:
+                recordEvent(event)
+                handleEvent(event)
+
+            # shooting is held down rather than pressed
+            shootPressed = pygame.K_SPACE in currentInput.held
+            if shootPressed != player.shootPressed:
+                recordInput(replays.SHOOT, int(shootPressed))
+            player.shootPressed = shootPressed
         #################################
 
-            # if player dead = cant move
-            if not player.playerDead and canPlayGame:
-                # player movement on key down and player stop on key up
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_LEFT or event.key == pygame.K_a:
-                        player.leftPressed = True
-                    if event.key == pygame.K_RIGHT or event.key == pygame.K_d:
-                        player.rightPressed = True
-                    if event.key == pygame.K_UP or event.key == pygame.K_w:
-                        player.upPressed = True
-                    if event.key == pygame.K_DOWN or event.key == pygame.K_s:
-                        player.downPressed = True
-
-                if event.type == pygame.KEYUP:
-                    if event.key == pygame.K_LEFT or event.key == pygame.K_a:
-                        player.leftPressed = False
-                    if event.key == pygame.K_RIGHT or event.key == pygame.K_d:
-                        player.rightPressed = False
-                    if event.key == pygame.K_UP or event.key == pygame.K_w:
-                        player.upPressed = False
-                    if event.key == pygame.K_DOWN or event.key == pygame.K_s:
-                        player.downPressed = False
-
-        # if not in menu
-        if canPlayGame:
-            # if player is dead - stop all these things
-            if not player.playerDead:
-                # move or destory bullets
-                for bullet in bullets:
-                    # only move if within screen
-                    if bullet.x < displayWidth and bullet.x > 0 and bullet.y < displayHeight and bullet.y > 0:
-                        if "left" in bullet.facing or "right" in bullet.facing:
-                            bullet.x += bullet.speed
-                        elif bullet.facing == "up" or bullet.facing == "down":
-                            bullet.y += bullet.speed
-                    else:
-                        # remove bullet
-                        bullets.pop(bullets.index(bullet))
-
-                # enemy bullet collision with screen
-                for bullet in enemyBullets:
-                    # only move if within screen
-                    if not (bullet.x < displayWidth and bullet.x > 0 and bullet.y < displayHeight and bullet.y > 0):
-                        # remove bullet
-                        enemyBullets.pop(enemyBullets.index(bullet))
-
-                # move enemies
-                for enemy in enemies:
-                    enemy.followPlayer(player)
-
-                # shooting and cooldown
-                shootCooldown = 500  # 0.5 second cooldown
-                keys = pygame.key.get_pressed()
-
-                if keys[pygame.K_SPACE]:
-                    # shoot if press space
-                    now = pygame.time.get_ticks()
-                    if now - lastFire >= shootCooldown:
-                        bullets.append(Bullet(player.x + player.width / 2,
-                                              player.y + player.height / 2, player.facingDirection))
-                        lastFire = now
-
-                # spawn enemies
-                # during wave mode - limited spawns
-                if player.waveNumber < len(player.data):
-                    enemiesToSpawn = player.data[player.waveNumber -
-                                                 1]["EnemiesToKill"]
-                    if player.enemiesSpawned < enemiesToSpawn:
-                        now = pygame.time.get_ticks()
-                        if now - lastSpawn >= spawnCooldown:
-                            spawnEnemyAtRanPos(
-                                player.enemyTypesForWave, player.enemyWeightsForWave)
-                            lastSpawn = now
-                            player.enemiesSpawned += 1
-                # endless mode - endless spawns
-                else:
-                    now = pygame.time.get_ticks()
-                    if now - lastSpawn >= spawnCooldown:
-                        spawnEnemyAtRanPos(
-                            player.enemyTypesForWave, player.enemyWeightsForWave)
-                        lastSpawn = now
-                        player.enemiesSpawned += 1
-
-                # player collisions with the wall
-                if player.x > displayWidth - player.width:
-                    player.hasCollidedRight = True
-                elif player.x < 0:
-                    player.hasCollidedLeft = True
-                else:
-                    player.hasCollidedRight = False
-                    player.hasCollidedLeft = False
-
-                if player.y > displayHeight - player.height:
-                    player.hasCollidedDown = True
-                elif player.y < 0:
-                    player.hasCollidedUp = True
-                else:
-                    player.hasCollidedUp = False
-                    player.hasCollidedDown = False
-
-                # collisions between bullet and enemies
-                for bullet in bullets:
-                    for enemy in enemies:
-                        # check if they have collided, if enemy is dead, don't collide
-                        if bullet.rect.colliderect(enemy.rect) and not enemy.health <= 0:
-                            # remove bullet from bullet list
-                            if bullet in bullets:
-                                bullets.pop(bullets.index(bullet))
-                            # make enemy take damage
-                            enemy.takeDamage(1, enemies)
-
-                # collisions between player and enemies
-                now = pygame.time.get_ticks()
-                for enemy in enemies:
-                    if enemy.rect.colliderect(player.rect):
-                        if now - lastHit >= player.hitCooldown:   # invulnerability cooldown
-                            player.takeDamage(enemy.damage)
-                            lastHit = now
-
-                # collisions between player and enemy bullets
-                for bullet in enemyBullets:
-                    if bullet.rect.colliderect(player.rect):
-                        if now - lastHit >= player.hitCooldown:   # invulnerability cooldown
-                            player.takeDamage(bullet.damage)
-                            # destroy bullet
-                            enemyBullets.pop(enemyBullets.index(bullet))
-                            lastHit = now
-
-                # player flash
-                nowCount = pygame.time.get_ticks()
-                # is hitcooldown is over - basically the player can only flash after the player has been hit and before the hitcooldown resets
-                if now - lastHit < player.hitCooldown - 150:
-                    if nowCount - player.lastFlash >= player.flashCooldown:  # cooldown of every flash
-                        player.shouldFlash = not player.shouldFlash
-                        player.lastFlash = nowCount
-                else:
-                    player.canFlash = False
-
-            # if player is dead
-            if player.playerDead:
-                # set to not transparent
-                player.currentImg.set_alpha(255)
-                # kill all enemies
-                if len(enemies) > 0:
-                    for enemy in enemies:
-                        # set enemy health to 0
-                        enemy.health = 0
-                        if enemy.deathAnimFinished:
-                            # destroy enemy object
-                            enemies.pop(enemies.index(enemy))
-                # remove all bullets
-                if len(bullets) > 0:
-                    for bullet in bullets:
-                        bullets.pop(bullets.index(bullet))
-                if len(enemyBullets) > 0:
-                    for bullet in enemyBullets:
-                        enemyBullets.pop(enemyBullets.index(bullet))
-                # reset player's velocity and 'pressed' bools
-                player.playerVelocity[0] = 0
-                player.playerVelocity[1] = 0
-                player.leftPressed = False
-                player.rightPressed = False
-                player.upPressed = False
-                player.downPressed = False
-
-                # log highcore
-                f = open('data\highscore.txt', "r")
-                scoreToCheck = f.readline()
-                f.close()
-                if player.score > int(scoreToCheck):
-                    f = open('data\highscore.txt', "w")
-                    f.write(str(player.score))
-                    f.close()
-
-        updateFrame()
-
-
-gameLoop()
-# quitGame()
+        # run enough ticks to catch up with real time
+        ticksRun = 0
+        while lag >= simClock.stepMs and ticksRun < maxTicksPerFrame:
+            lag -= simClock.stepMs
+            ticksRun += 1
+        # if too far behind, give up on catching up rather than freezing
+        if ticksRun == maxTicksPerFrame:
+            lag = 0
+
+        if simWorker is not None and isPlaying():
+            if drawList is None:
+                # first frame of a game - nothing has been simulated ahead yet
+                drawList = buildDrawList()
+            # the hud is read now, before the simulation starts changing things
+            overlay = tuple(hudSprites() + profilerSprites())
+            # the ticks run on the worker while the last frame's results are drawn here
+            simulated = simWorker.submit(simulateFrame, ticksRun)
+            with profiler.scope("draw pipelined"):
+                drawFromList(drawList + overlay)
+            with profiler.scope("display"):
+                renderer.update()
+            drawList = simulated.result()
+        else:
+            # menus and the death screen handle clicks while drawing, so they aren't pipelined
+            drawList = None
+            runTicks(ticksRun)
+            updateFrame()
+        # the time to the first menu frame (which loads the menu image and fonts)
+        if "first frame" not in startupTimes:
+            startupStep("first frame")
+            if reportStartup:
+                printStartupTimes()
+
+        counters = {"enemies": len(enemies), "bullets": len(bullets),
+                    "enemyBullets": len(enemyBullets), "ticks": ticksRun}
+        if assets.checkFormats:
+            counters["slowBlits"] = sum(assets.slowBlits.values())
+        profiler.endFrame(counters)
+
+    if simWorker is not None:
+        simWorker.shutdown()
+    finishRecording()
+    profiler.stopTrace()
+    # make sure the highscores have been saved before quitting
+    scoreStore.flush()
+
+
+# running this file's code (not counting the imports)
+startupTimes["module"] = time.perf_counter() - moduleStart
+
+
+if __name__ == "__main__":
+    gameLoop()
@@ -0,0 +1,233 @@
+# Runs the game with no display, as fast as the CPU allows
+# The game is simulated in fixed ticks with game.simulationTick(), so a run
+# here plays out exactly like it would on screen, just without any drawing.
+# It's for soak testing waves and balance changes - e.g. to simulate 10
+# minutes of play with a bot and seed 3:
+#   python headless.py --seconds 600 --seed 3
+# It can also play back a replay recorded by the game (recordReplayFile in
+# game.py), drawing every so often or not at all:
+#   python headless.py --replay session.replay --render-every 60
+
+import argparse
+import os
+import random
+import time
+
+# use SDL's dummy video driver so no window is opened
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+# the game loads everything relative to its own folder
+os.chdir(os.path.dirname(os.path.abspath(__file__)))
+
+import pygame  # noqa: E402
+import game  # noqa: E402
+from data import replays  # noqa: E402
+
+# open the (dummy) window and load the game
+game.bootstrap()
+
+
+# a simple bot - always shooting at the nearest enemy
+# it lines itself up with the enemy on whichever axis is closer, then taps
+# towards it for one tick to face it (so the bullets go its way)
+def turretBot(tick):
+    player = game.player
+    player.shootPressed = True
+    player.leftPressed = False
+    player.rightPressed = False
+    player.upPressed = False
+    player.downPressed = False
+
+    # centres of the player and the nearest living enemy
+    playerX = player.x + player.width / 2
+    playerY = player.y + player.height / 2
+    nearest = None
+    nearestDist = 0
+    for enemy in game.enemies:
+        if enemy.health <= 0:
+            continue
+        dist = (enemy.x - player.x) ** 2 + (enemy.y - player.y) ** 2
+        if nearest is None or dist < nearestDist:
+            nearest = enemy
+            nearestDist = dist
+    if nearest is None:
+        return
+    difX = nearest.x + nearest.width / 2 - playerX
+    difY = nearest.y + nearest.height / 2 - playerY
+
+    # enemy is more to the side - shoot left or right
+    if abs(difX) > abs(difY):
+        if abs(difY) > nearest.height / 2:
+            player.downPressed = difY > 0
+            player.upPressed = difY < 0
+        elif tick % 10 == 0:
+            player.rightPressed = difX > 0
+            player.leftPressed = difX < 0
+    # enemy is more above or below - shoot up or down
+    else:
+        if abs(difX) > nearest.width / 2:
+            player.rightPressed = difX > 0
+            player.leftPressed = difX < 0
+        elif tick % 10 == 0:
+            player.downPressed = difY > 0
+            player.upPressed = difY < 0
+
+
+# simulate the game for a number of seconds
+# controller - called with the tick number before every tick to set the player's inputs
+# stopOnDeath - stop when the player dies instead of running the full time
+# returns a dictionary of stats about the run
+def run(seconds, seed=None, controller=turretBot, stopOnDeath=True):
+    random.seed(seed)
+    game.saveHighscores = False
+    game.resetGame()
+    game.playGame()
+
+    ticks = int(seconds * game.tickRate)
+    peakEnemies = 0
+    peakBullets = 0
+    # wave number -> kills in that wave, and ticks spent on it
+    killsPerWave = {}
+    ticksPerWave = {}
+    startTime = time.perf_counter()
+    for tick in range(ticks):
+        if controller is not None:
+            controller(tick)
+        game.simulationTick()
+        peakEnemies = max(peakEnemies, len(game.enemies))
+        peakBullets = max(peakBullets, len(game.bullets) + len(game.enemyBullets))
+        waveNumber = game.player.waveNumber
+        killsPerWave[waveNumber] = game.player.enemiesKilled
+        ticksPerWave[waveNumber] = ticksPerWave.get(waveNumber, 0) + 1
+        if stopOnDeath and game.player.playerDead:
+            break
+    realSeconds = time.perf_counter() - startTime
+
+    simulatedSeconds = game.simClock.seconds()
+    return {
+        'seed': seed,
+        'simulatedSeconds': simulatedSeconds,
+        'realSeconds': realSeconds,
+        'speed': simulatedSeconds / realSeconds if realSeconds > 0 else 0,
+        'died': game.player.playerDead,
+        'wave': game.player.waveNumber,
+        'score': game.player.score,
+        'peakEnemies': peakEnemies,
+        'peakBullets': peakBullets,
+        'killsPerWave': killsPerWave,
+        'secondsPerWave': {waveNumber: waveTicks / game.tickRate
+                           for waveNumber, waveTicks in ticksPerWave.items()},
+    }
+
+
+# do what a replay record says, like the game loop would have
+def applyRecord(record):
+    tick, kind, a, b = record
+    if kind == replays.KEYDOWN:
+        game.handleEvent(pygame.event.Event(pygame.KEYDOWN, key=a))
+    elif kind == replays.KEYUP:
+        game.handleEvent(pygame.event.Event(pygame.KEYUP, key=a))
+    elif kind == replays.SHOOT:
+        game.player.shootPressed = bool(a)
+    elif kind == replays.PLAY:
+        game.playGame()
+    elif kind == replays.MENU:
+        game.quitToMenu()
+    # mouse records are only kept for reference - what the clicks did is recorded as PLAY and MENU
+
+
+# play back a replay file as fast as possible
+# renderEvery - draw a frame every this many ticks, 0 to never draw
+# returns a dictionary of stats about the run, including whether it ended
+# with the same score and wave as the recording
+def playReplay(filename, renderEvery=0):
+    replay = replays.loadReplay(filename)
+    if replay.tickRate != game.tickRate:
+        raise ValueError('replay was recorded at %d ticks a second, the game runs at %d' %
+                         (replay.tickRate, game.tickRate))
+
+    # start the same way the game does - in the menu, with the recording's seed and screen size
+    random.seed(replay.seed)
+    game.saveHighscores = False
+    game.quitToMenu()
+    game.resetGame()
+    game.displayWidth = replay.width
+    game.displayHeight = replay.height
+
+    records = replay.records
+    nextRecord = 0
+    peakEnemies = 0
+    framesDrawn = 0
+    startTime = time.perf_counter()
+    for tick in range(replay.endTick):
+        # inputs are recorded with the tick they happened before
+        while nextRecord < len(records) and records[nextRecord][0] <= tick:
+            applyRecord(records[nextRecord])
+            nextRecord += 1
+        game.simulationTick()
+        peakEnemies = max(peakEnemies, len(game.enemies))
+        if renderEvery and tick % renderEvery == 0:
+            game.updateFrame()
+            framesDrawn += 1
+    realSeconds = time.perf_counter() - startTime
+
+    simulatedSeconds = game.simClock.seconds()
+    matches = None
+    if replay.score is not None:
+        matches = (game.player.score == replay.score and
+                   game.player.waveNumber == replay.waveNumber)
+    return {
+        'seed': replay.seed,
+        'simulatedSeconds': simulatedSeconds,
+        'realSeconds': realSeconds,
+        'speed': simulatedSeconds / realSeconds if realSeconds > 0 else 0,
+        'died': game.player.playerDead,
+        'wave': game.player.waveNumber,
+        'score': game.player.score,
+        'peakEnemies': peakEnemies,
+        'framesDrawn': framesDrawn,
+        'matches': matches,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Run Invasion of the Tacos with no display.')
+    parser.add_argument('--seconds', type=float, default=300,
+                        help='simulated seconds to run for (default 300)')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='random seed for enemy spawns')
+    parser.add_argument('--no-bot', action='store_true',
+                        help="don't use the bot - the player just stands still")
+    parser.add_argument('--keep-going', action='store_true',
+                        help="keep running after the player dies")
+    parser.add_argument('--replay', metavar='FILE',
+                        help='play back a replay file instead of using the bot')
+    parser.add_argument('--render-every', type=int, default=0, metavar='TICKS',
+                        help='when playing a replay, draw a frame every this many ticks (default never)')
+    args = parser.parse_args()
+
+    if args.replay:
+        try:
+            stats = playReplay(args.replay, args.render_every)
+        except (OSError, ValueError) as e:
+            print('Unable to play replay:', e)
+            raise SystemExit(1)
+    else:
+        stats = run(args.seconds, args.seed,
+                    None if args.no_bot else turretBot, not args.keep_going)
+    print('Simulated %.1f seconds in %.2f seconds (%.0fx real time)' %
+          (stats['simulatedSeconds'], stats['realSeconds'], stats['speed']))
+    print('Wave %d, score %d, peak enemies %d%s' %
+          (stats['wave'], stats['score'], stats['peakEnemies'],
+           ', player died' if stats['died'] else ''))
+    if args.replay:
+        if stats['matches'] is None:
+            print('The replay was not finished, so the result could not be checked')
+        elif stats['matches']:
+            print('Matches the recording')
+        else:
+            print('Does NOT match the recording')
+
+
+if __name__ == '__main__':
+    main()